@@ -13,7 +13,14 @@ from matplotlib.offsetbox import AnchoredText
 
 
 def animate(
-    f, gen, interval=100, default_mode=None, fig=None, show_params=True, **kwargs
+    f,
+    gen,
+    interval=100,
+    default_mode=None,
+    fig=None,
+    show_params=True,
+    seed=0,
+    **kwargs,
 ):
     """
     Animate a series of calls to the function f.  That function should create
@@ -28,6 +35,9 @@ def animate(
     * fig: pass in a matplot lib Figure if you do not want the function to create
         a new figure for the animation.
     * show_params: Show the parameters to f in a box to the side of the figure.
+    * seed: The seed for np.random at the start of each frame, so random
+        draws in f are repeatable.  The caller's random state is restored
+        after each frame.  Use None to leave np.random alone.
     * **kwargs: Any additional kwargs are pass to the constructor for Figure.
         Requires fig to be None.
     """
@@ -48,9 +58,17 @@ def animate(
 
             parameters = {k: args[k] for k in parameter_names}
 
-            np.random.seed(0)  # make sort-of deterministic...
-
-            f(**parameters)
+            if seed is None:
+                f(**parameters)
+            else:
+                # make sort-of deterministic, without disturbing the
+                # caller's random state...
+                saved_state = np.random.get_state()
+                try:
+                    np.random.seed(seed)
+                    f(**parameters)
+                finally:
+                    np.random.set_state(saved_state)
 
             ax = fig.axes()[-1]
 
@@ -0,0 +1,125 @@
+__all__ = []
+
+import fnmatch
+import hashlib
+import os
+import sys
+
+import numpy as np
+
+from .version import __version__
+
+
+def cache_directory(name):
+    """
+    The directory for cached files of the given kind, inside the usual
+    per-user cache directory for the platform.  Set the CS104_CACHE_DIR
+    environment variable to keep them somewhere else.
+    """
+    root = os.environ.get("CS104_CACHE_DIR")
+    if root is None:
+        if sys.platform == "win32":
+            base = os.environ.get(
+                "LOCALAPPDATA",
+                os.path.join(os.path.expanduser("~"), "AppData", "Local"),
+            )
+        elif sys.platform == "darwin":
+            base = os.path.join(os.path.expanduser("~"), "Library", "Caches")
+        else:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+                os.path.expanduser("~"), ".cache"
+            )
+        root = os.path.join(base, "cs104")
+    return os.path.join(root, name)
+
+
+def content_hash(*parts):
+    """
+    Return a hex digest identifying parts.  Arrays are identified by their
+    dtype, shape, and contents, and anything else by its repr.  The cs104
+    version is included, so upgrading the library starts a fresh cache.
+    """
+    digest = hashlib.sha256(__version__.encode())
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            if part.dtype.kind == "O":
+                data = repr(part.tolist()).encode()
+            else:
+                data = np.ascontiguousarray(part).tobytes()
+            data = f"{part.dtype.str}{part.shape}".encode() + data
+        elif isinstance(part, bytes):
+            data = part
+        else:
+            data = repr(part).encode()
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class FileCache:
+    """
+    A directory of files named by content hash that holds at most
+    max_bytes.  Storing a file deletes the least recently used ones
+    until the directory fits.  Only files whose names match pattern
+    count as part of the cache, so it can share a directory with others.
+    Problems reading or writing the directory (eg: a read-only home
+    directory) make the cache miss rather than fail, since everything in
+    it can be computed again.
+    """
+
+    def __init__(self, directory, max_bytes, pattern="*"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.pattern = pattern
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def get(self, name):
+        """Return the contents of the file name, or None if it is not cached."""
+        try:
+            with open(self.path(name), "rb") as f:
+                data = f.read()
+            os.utime(self.path(name))  # mark it as recently used
+            return data
+        except OSError:
+            return None
+
+    def put(self, name, data, shrink=True):
+        """
+        Save data as the file name.  Pass shrink=False when storing many
+        files at once, and call shrink() after the last one.
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            temp_path = self.path(name) + f".{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self.path(name))
+            if shrink:
+                self.shrink()
+        except OSError:
+            pass
+
+    def shrink(self):
+        """Delete the least recently used files until the cache fits."""
+        if not os.path.isdir(self.directory):
+            return
+        files = []
+        for entry in os.scandir(self.directory):
+            if (
+                entry.is_file()
+                and fnmatch.fnmatch(entry.name, self.pattern)
+                and not entry.name.endswith(".tmp")
+            ):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # another notebook removed it first
+            total -= size
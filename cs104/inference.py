@@ -11,9 +11,25 @@ https://cs104williams.github.io/assets/inference-library-ref.html
 __all__ = [
     "simulate",
     "simulate_sample_statistic",
+    "SimulationSummary",
+    "summarize_statistics",
+    "Statistic",
+    "stat_mean",
+    "stat_median",
+    "stat_sd",
+    "stat_sum",
+    "stat_max",
+    "stat_min",
+    "stat_percentile",
+    "stat_count",
+    "stat_proportion",
+    "stat_tvd",
+    "stat_distribution_tvd",
+    "simulate_proportions",
     "empirical_pvalue",
     "permutation_sample",
     "abs_difference_of_means",
+    "max_difference_of_means",
     "simulate_permutation_statistic",
     "confidence_interval",
     "bootstrap_statistic",
@@ -21,6 +37,7 @@ __all__ = [
     "line_predictions",
     "mean_squared_error",
     "linear_regression",
+    "bootstrap_regression",
     "residuals",
     "r2_score",
     "plot_scatter_with_line",
@@ -29,28 +46,976 @@ __all__ = [
     "plot_regression_line_and_mse_heat",
 ]
 
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import functools
+import io
+import json
+import math
+import os
+import signal
+import time
+
 from datascience import *
 import numpy as np
 import matplotlib.pyplot as plots
 import matplotlib.colors as colors
 
+from .cache import FileCache, cache_directory, content_hash
 from .docs import doc_tag
+from .workers import seed_global_random, worker_context
+
+# The most index entries we draw at once when computing samples in bulk.
+# 2**22 int64 indices plus the sampled values is about 64MB.
+_MAX_BATCH_ELEMENTS = 2**22
+
+###
+
+
+class _ResultBuffer:
+    """
+    Collects simulation outcomes into a float array that grows geometrically,
+    so gathering n outcomes takes O(n) time instead of the O(n^2) of calling
+    np.append in a loop.  The result is the same array np.append would have
+    built, starting from make_array(): each outcome is flattened, and any
+    non-numeric outcome switches to np.append's type promotion rules.
+    Pass a dtype to collect the outcomes in a smaller array, such as
+    np.float32, or np.int32 for counts.
+    """
+
+    def __init__(self, capacity=0, dtype=float):
+        self._data = np.empty(max(int(capacity), 0), dtype=dtype)
+        self._size = 0
+        self._parts = None
+
+    def append(self, outcome):
+        values = np.ravel(outcome)
+        if self._parts is not None or values.dtype.kind not in "biuf":
+            # Rare case (eg: strings), so just keep the pieces and let
+            # np.concatenate pick the same dtype np.append would.
+            if self._parts is None:
+                self._parts = [self._data[: self._size]]
+            self._parts.append(values)
+            return
+
+        values = _as_dtype(values, self._data.dtype)
+        end = self._size + len(values)
+        if end > len(self._data):
+            grown = np.empty(max(2 * len(self._data), end, 16), dtype=self._data.dtype)
+            grown[: self._size] = self._data[: self._size]
+            self._data = grown
+        self._data[self._size : end] = values
+        self._size = end
+
+    def result(self):
+        if self._parts is not None:
+            return np.concatenate(self._parts)
+        if self._size == len(self._data):
+            return self._data
+        return self._data[: self._size].copy()
+
+
+def _as_dtype(values, dtype):
+    """
+    Convert the array values to dtype.  Converting to a smaller float
+    type rounds, but converting to an integer type must not change any
+    value, so that a dtype meant for counts does not silently truncate
+    other statistics.
+    """
+    converted = values.astype(dtype, copy=False)
+    if np.dtype(dtype).kind in "iu" and not np.array_equal(converted, values):
+        raise ValueError(
+            f"Cannot store the outcome {values[converted != values][0]} "
+            f"as {np.dtype(dtype).name} without changing it"
+        )
+    return converted
+
+
+######################################################################
+# Random numbers: the functions below take a seed, which may be None,
+# an int, or an np.random.Generator.  With no seed, they draw from the
+# global np.random state, exactly as they always have, so np.random.seed
+# still makes notebooks reproducible.  Otherwise, they draw from an
+# np.random.Generator (PCG64), which is also faster for bulk draws.
+######################################################################
+
+
+def _generator(seed):
+    """
+    Return the np.random.Generator for seed, or None to use the global
+    np.random state.  A Generator passed in is used as is.
+    """
+    if seed is None:
+        return None
+    return np.random.default_rng(seed)
+
+
+def _random_indices(rng, n, size):
+    """Random integers in [0, n), as np.random.choice(n, size) draws them."""
+    if rng is None:
+        return np.random.randint(0, n, size=size)
+    return rng.integers(0, n, size=size)
+
+
+def _random_permutations(rng, n, rows):
+    """A (rows, n) array whose rows are random permutations of range(n)."""
+    if rng is None:
+        # One call per row, so the draws match Table.sample's.
+        return np.array([np.random.permutation(n) for i in np.arange(rows)])
+    return rng.permuted(np.tile(np.arange(n), (rows, 1)), axis=1)
+
+
+######################################################################
+# Parallel simulation: trials are split into fixed-size blocks, each
+# with its own random stream spawned from one seed.  The blocks depend
+# only on the seed and num_trials, so the results are the same no matter
+# how many worker processes share the work.
+######################################################################
+
+_PARALLEL_BLOCK_TRIALS = 1000
+
+# The function a worker process calls to run one block of trials.
+_parallel_job = None
+
+
+def _set_parallel_job(job):
+    global _parallel_job
+    _parallel_job = job
+
+
+def _start_worker(job):
+    # Ctrl-C is for the notebook, which stops handing out blocks: the
+    # workers just finish the block they are running.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _set_parallel_job(job)
+
+
+def _run_block(block):
+    seed_sequence, num_trials = block
+    global_sequence, generator_sequence = seed_sequence.spawn(2)
+    seed_global_random(global_sequence)
+    rng = np.random.Generator(np.random.PCG64(generator_sequence))
+    return _parallel_job(num_trials, rng)
+
+
+def _run_parallel(job, num_trials, workers, seed, results, progress=None):
+    """
+    Run job(n, rng), which returns an array of n trials drawing from the
+    Generator rng, on blocks of trials that add up to num_trials, and
+    append the blocks to results (a _ResultBuffer or SimulationSummary)
+    in order.  Blocks run in this process when workers is 1, and in a
+    pool of workers processes otherwise.  Each finished block advances
+    progress, if it is given.
+    """
+    if workers is None:
+        workers = 1
+    if int(workers) < 1:
+        raise ValueError("workers must be at least 1, not " + str(workers))
+
+    num_trials = int(num_trials)
+    sizes = [_PARALLEL_BLOCK_TRIALS] * (num_trials // _PARALLEL_BLOCK_TRIALS)
+    if num_trials % _PARALLEL_BLOCK_TRIALS > 0:
+        sizes.append(num_trials % _PARALLEL_BLOCK_TRIALS)
+    first_block = 0
+    if isinstance(results, _Checkpoint):
+        seed = results.seed
+        first_block = math.ceil(results.completed / _PARALLEL_BLOCK_TRIALS)
+    elif isinstance(seed, np.random.Generator):
+        seed = int(seed.integers(2**63))
+    seed_sequences = np.random.SeedSequence(seed).spawn(len(sizes))
+    blocks = list(zip(seed_sequences, sizes))[first_block:]
+    sizes = sizes[first_block:]
+
+    def append_block(size, block_result):
+        if isinstance(results, _Checkpoint) and np.size(block_result) != size:
+            raise ValueError("Each trial must give a single number to use a checkpoint")
+        results.append(block_result)
+        if progress is not None:
+            progress.advance(size)
+
+    context = worker_context(job) if int(workers) > 1 else None
+    if int(workers) > 1 and context is None:
+        print(
+            "The simulation cannot be sent to worker processes on this "
+            "platform, so it will run in this process instead."
+        )
+        workers = 1
+
+    if int(workers) == 1:
+        # Seeded runs should not disturb the caller's global random state.
+        saved_state = np.random.get_state()
+        try:
+            _set_parallel_job(job)
+            for block in blocks:
+                append_block(block[1], _run_block(block))
+        finally:
+            _set_parallel_job(None)
+            np.random.set_state(saved_state)
+        return results.result()
+
+    with ProcessPoolExecutor(
+        max_workers=int(workers),
+        mp_context=context,
+        initializer=_start_worker,
+        initargs=(job,),
+    ) as executor:
+        try:
+            for size, block_result in zip(sizes, executor.map(_run_block, blocks)):
+                append_block(size, block_result)
+        except KeyboardInterrupt:
+            executor.shutdown(cancel_futures=True)
+            raise
+    return results.result()
+
+
+######################################################################
+# Progress: long simulations can report how far along they are, and
+# can be stopped with Ctrl-C (or the notebook's stop button) without
+# losing the trials already run.
+######################################################################
+
+
+class _Progress:
+    """
+    Tracks how many of num_trials trials are done.  The simulation loops
+    call advance(n) after every step trials, so reporting costs nothing
+    noticeable no matter how fast the trials are.  The report is either a
+    function called as report(completed, num_trials, trials_per_second,
+    seconds_remaining), or True to show a progress bar: a tqdm bar if tqdm
+    is installed (a widget in Jupyter), or a line of text otherwise.
+    """
+
+    # About how many times to report over the whole simulation.
+    _UPDATES = 100
+
+    def __init__(self, num_trials, report, completed=0):
+        self.num_trials = int(num_trials)
+        self.completed = self._initial = int(completed)
+        self.step = max(1, self.num_trials // self._UPDATES)
+        self._start = time.perf_counter()
+        self._bar = None
+        self._report = report
+        if not callable(report):
+            try:
+                from tqdm.auto import tqdm
+
+                self._bar = tqdm(
+                    total=self.num_trials, initial=self.completed, unit="trial"
+                )
+            except ImportError:
+                self._report = _print_progress
+
+    def advance(self, n):
+        self.completed += n
+        if self._bar is not None:
+            self._bar.update(n)
+            return
+        elapsed = time.perf_counter() - self._start
+        rate = (self.completed - self._initial) / elapsed if elapsed > 0 else math.inf
+        remaining = (self.num_trials - self.completed) / rate if rate > 0 else math.nan
+        self._report(self.completed, self.num_trials, rate, remaining)
+
+    def close(self):
+        if self._bar is not None:
+            self._bar.close()
+        elif self._report is _print_progress:
+            print()
+
+
+def _print_progress(completed, num_trials, trials_per_second, seconds_remaining):
+    print(
+        f"\r{completed}/{num_trials} trials "
+        f"[{trials_per_second:,.0f} trials/s, {seconds_remaining:.0f}s left]",
+        end="",
+        flush=True,
+    )
+
+
+def _trial_chunks(num_trials, progress):
+    """
+    Yield numbers of trials adding up to num_trials, advancing progress
+    (a _Progress or None) as each run of trials finishes.
+    """
+    num_trials = int(num_trials)
+    if progress is None:
+        yield num_trials
+        return
+    for start in range(0, num_trials, progress.step):
+        chunk = min(progress.step, num_trials - start)
+        yield chunk
+        progress.advance(chunk)
+
+
+def _with_progress(run, num_trials, results, progress):
+    """
+    Return run(tracker), where tracker is a _Progress for the progress
+    argument of a simulation function, or None if progress is False or
+    None.  If the run is interrupted, return the results collected so far.
+    """
+    tracker = None
+    if progress:
+        completed = results.completed if isinstance(results, _Checkpoint) else 0
+        tracker = _Progress(num_trials, progress, completed)
+    interrupted = False
+    try:
+        outcomes = run(tracker)
+    except KeyboardInterrupt:
+        interrupted = True
+        outcomes = results.result()
+    finally:
+        if tracker is not None:
+            tracker.close()
+    if interrupted:
+        print(
+            f"Interrupted: returning the results of {len(outcomes)} "
+            f"of {int(num_trials)} trials."
+        )
+    return outcomes
+
+
+######################################################################
+# Checkpoints: very large simulations can save their trials to a .npy
+# file as they go, and pick up where they left off if they are stopped.
+######################################################################
+
+
+class _Checkpoint:
+    """
+    Collects the outcomes of a simulation run by _run_parallel in the .npy
+    file at path, which holds one number of the given dtype per trial.
+    The file path + ".json" records the seed and how many trials are
+    complete, so running the same simulation with the same path again
+    skips the blocks already done.
+    Trials are flushed to disk every _SAVE_TRIALS trials, at the end, and
+    when the run is interrupted.  Other notebooks can read the trials at
+    any time with np.load(path, mmap_mode="r").
+    """
+
+    _SAVE_TRIALS = 100 * _PARALLEL_BLOCK_TRIALS
+
+    def __init__(self, path, num_trials, seed, dtype=float):
+        self.path = os.fspath(path)
+        self.num_trials = int(num_trials)
+        state = self._load_state()
+        if state is None:
+            if os.path.exists(self.path):
+                raise ValueError(
+                    f"{self.path} exists but is not a simulation checkpoint"
+                )
+            if isinstance(seed, np.random.Generator):
+                seed = int(seed.integers(2**63))
+            elif seed is None:
+                seed = np.random.SeedSequence().entropy
+            self.seed = int(seed)
+            self.completed = 0
+            self._data = np.lib.format.open_memmap(
+                self.path, mode="w+", dtype=dtype, shape=(self.num_trials,)
+            )
+            self._save_state()
+        else:
+            if state["num_trials"] != self.num_trials:
+                raise ValueError(
+                    f"The checkpoint {self.path} is for {state['num_trials']} "
+                    f"trials, not {self.num_trials}.  Delete it to start over."
+                )
+            if isinstance(seed, (int, np.integer)) and seed != state["seed"]:
+                raise ValueError(
+                    f"The checkpoint {self.path} was made with seed "
+                    f"{state['seed']}, not {seed}.  Delete it to start over."
+                )
+            self.seed = state["seed"]
+            self.completed = state["completed"]
+            self._data = np.load(self.path, mmap_mode="r+")
+            if self._data.dtype != np.dtype(dtype):
+                raise ValueError(
+                    f"The checkpoint {self.path} holds {self._data.dtype.name} "
+                    f"values, not {np.dtype(dtype).name}.  Delete it to start over."
+                )
+        self._saved = self.completed
+
+    def _state_path(self):
+        return self.path + ".json"
+
+    def _load_state(self):
+        if not (os.path.exists(self._state_path()) and os.path.exists(self.path)):
+            return None
+        with open(self._state_path()) as f:
+            return json.load(f)
+
+    def _save_state(self):
+        self._data.flush()
+        state = {
+            "num_trials": self.num_trials,
+            "seed": self.seed,
+            "completed": self.completed,
+        }
+        # Replace the old state in one step, so a crash never leaves half
+        # a file behind.
+        temp_path = self._state_path() + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(temp_path, self._state_path())
+        self._saved = self.completed
+
+    def append(self, outcome):
+        values = _as_dtype(np.ravel(outcome), self._data.dtype)
+        end = self.completed + len(values)
+        self._data[self.completed : end] = values
+        self.completed = end
+        if self.completed - self._saved >= self._SAVE_TRIALS:
+            self._save_state()
+
+    def result(self):
+        self._save_state()
+        return np.load(self.path, mmap_mode="r")[: self.completed]
+
+
+def _simulation_results(
+    num_trials,
+    summarize=False,
+    observed_statistic=None,
+    checkpoint=None,
+    seed=None,
+    dtype=float,
+):
+    """
+    Return the object collecting the results of a simulation function:
+    a _Checkpoint, SimulationSummary, or _ResultBuffer.  Summaries take
+    the same space for any dtype, so they ignore it.
+    """
+    if checkpoint is not None:
+        if summarize:
+            raise ValueError("Cannot both summarize and checkpoint a simulation")
+        return _Checkpoint(checkpoint, num_trials, seed, dtype)
+    if summarize:
+        return SimulationSummary(observed_statistic)
+    return _ResultBuffer(num_trials, dtype)
+
+
+######################################################################
+# Summaries of very large simulations: running statistics that take a
+# fixed amount of memory no matter how many trials there are.
+######################################################################
+
+
+class _QuantileSketch:
+    """
+    Approximate percentiles for a stream of values in O(capacity * log n)
+    memory.  Level i holds sorted values that each stand for 2**i of the
+    original values.  When a level fills up, every other value moves up
+    to the next level, alternating which half we keep so the errors do
+    not all lean the same way.  Until the first level fills, the
+    percentiles are exact.
+    """
+
+    def __init__(self, capacity=2**14):
+        self._capacity = capacity
+        self._levels = []
+        self._next_offset = 0
+
+    def update(self, values):
+        level = 0
+        values = np.asarray(values, dtype=float)
+        while len(values) > 0:
+            if level == len(self._levels):
+                self._levels.append(np.empty(0))
+            merged = np.concatenate([self._levels[level], values])
+            if len(merged) < self._capacity:
+                self._levels[level] = merged
+                return
+
+            merged.sort()
+            keep = len(merged) % 2
+            self._levels[level] = merged[:keep]
+            values = merged[keep + self._next_offset :: 2]
+            self._next_offset = 1 - self._next_offset
+            level += 1
+
+    def percentile(self, p):
+        """
+        The value at least as great as p% of the values, as in the
+        datascience percentile function.
+        """
+        weights = [np.full(len(values), 2**i) for i, values in enumerate(self._levels)]
+        values = np.concatenate(self._levels)
+        weights = np.concatenate(weights)
+        order = np.argsort(values, kind="stable")
+        values = values[order]
+        total = np.cumsum(weights[order])
+        rank = max(int(np.ceil(p / 100 * total[-1])), 1)
+        return values[np.searchsorted(total, rank)]
+
+
+class SimulationSummary:
+    """
+    The count, mean, standard deviation, min, max, and approximate
+    percentiles of a stream of simulated statistics, along with the
+    number of them at least as big as each observed statistic of interest.
+    The memory used does not grow with the number of trials.
+
+    A summary can be passed to empirical_pvalue and confidence_interval
+    in place of an array of statistics.
+    """
+
+    # outcomes are gathered into chunks of this size before being summarized
+    _CHUNK_SIZE = 2**16
+
+    def __init__(self, observed_statistic=None):
+        """
+        observed_statistic is a value (or array of values) that we will
+        later want an empirical p-value for.
+        """
+        if observed_statistic is None:
+            observed_statistic = make_array()
+        self._observed = np.ravel(observed_statistic).astype(float)
+        self._at_least_observed = np.zeros(len(self._observed), dtype=int)
+        self._at_most_observed = np.zeros(len(self._observed), dtype=int)
+        self._count = 0
+        self._mean = 0.0
+        self._sum_squared_deviations = 0.0
+        self._min = np.inf
+        self._max = -np.inf
+        self._sketch = _QuantileSketch()
+        self._chunk = np.empty(self._CHUNK_SIZE)
+        self._chunk_size = 0
+
+    def append(self, outcome):
+        values = np.ravel(outcome)
+        if values.dtype.kind not in "biuf":
+            raise ValueError(
+                "Only numerical statistics can be summarized, not values of type "
+                + str(values.dtype)
+            )
+        while len(values) > 0:
+            room = self._CHUNK_SIZE - self._chunk_size
+            taken = values[:room]
+            self._chunk[self._chunk_size : self._chunk_size + len(taken)] = taken
+            self._chunk_size += len(taken)
+            values = values[room:]
+            if self._chunk_size == self._CHUNK_SIZE:
+                self._flush()
+
+    def _flush(self):
+        chunk = self._chunk[: self._chunk_size]
+        self._chunk_size = 0
+        if len(chunk) == 0:
+            return
+
+        # Combine the running mean and squared deviations with the chunk's
+        # (the parallel form of Welford's algorithm).
+        chunk_mean = np.mean(chunk)
+        chunk_squared_deviations = np.sum((chunk - chunk_mean) ** 2)
+        count = self._count + len(chunk)
+        delta = chunk_mean - self._mean
+        self._mean += delta * len(chunk) / count
+        self._sum_squared_deviations += (
+            chunk_squared_deviations + delta**2 * self._count * len(chunk) / count
+        )
+        self._count = count
+
+        self._min = min(self._min, np.min(chunk))
+        self._max = max(self._max, np.max(chunk))
+        self._at_least_observed += np.count_nonzero(
+            chunk[:, np.newaxis] >= self._observed, axis=0
+        )
+        self._at_most_observed += np.count_nonzero(
+            chunk[:, np.newaxis] <= self._observed, axis=0
+        )
+        self._sketch.update(chunk)
+
+    def result(self):
+        self._flush()
+        return self
+
+    def __len__(self):
+        self._flush()
+        return self._count
+
+    @property
+    def mean(self):
+        self._flush()
+        return self._mean
+
+    @property
+    def sd(self):
+        """The standard deviation, as computed by np.std."""
+        self._flush()
+        return np.sqrt(self._sum_squared_deviations / self._count)
+
+    @property
+    def min(self):
+        self._flush()
+        return self._min
+
+    @property
+    def max(self):
+        self._flush()
+        return self._max
+
+    def percentile(self, p):
+        """
+        The approximate pth percentile of the statistics, using the same
+        definition as the datascience percentile function.
+        """
+        self._flush()
+        if self._count == 0:
+            raise ValueError("Cannot compute a percentile of an empty summary.")
+        if p == 0:
+            return self._min
+        if p == 100:
+            return self._max
+        return self._sketch.percentile(p)
+
+    def empirical_pvalue(self, observed_statistic, tail="right"):
+        """
+        The proportion of statistics at least as extreme as
+        observed_statistic, as in empirical_pvalue.  The observed
+        statistic (or each one, if it is an array) must be one of the
+        observed statistics the summary was created with.
+        """
+        self._flush()
+        if np.ndim(observed_statistic) != 0:
+            return np.array(
+                [self.empirical_pvalue(v, tail) for v in observed_statistic]
+            )
+
+        matches = np.flatnonzero(self._observed == observed_statistic)
+        if len(matches) == 0:
+            raise ValueError(
+                "This summary can only compute p-values for the observed "
+                "statistics it was created with: "
+                + ", ".join(str(v) for v in self._observed)
+            )
+        return _tail_pvalue(
+            self._at_least_observed[matches[0]] / self._count,
+            self._at_most_observed[matches[0]] / self._count,
+            tail,
+        )
+
+    def __repr__(self):
+        return "SimulationSummary(trials={}, mean={}, sd={})".format(
+            len(self), self.mean, self.sd
+        )
+
+
+@doc_tag(path="inference-library-ref.html")
+def summarize_statistics(statistics, observed_statistic=None):
+    """
+    Return a SimulationSummary of statistics, which may be an array or any
+    iterable of values, such as a generator.  The values are consumed one
+    at a time, so a generator of millions of values never needs to be
+    stored.  Pass observed_statistic to be able to compute its
+    empirical_pvalue from the summary.
+    """
+    summary = SimulationSummary(observed_statistic)
+    if isinstance(statistics, np.ndarray):
+        summary.append(statistics)
+    else:
+        for statistic in statistics:
+            summary.append(statistic)
+    return summary.result()
+
+
+######################################################################
+# Statistics that the simulation functions can compute for a whole
+# batch of samples at once, rather than calling a function per sample.
+######################################################################
+
+
+class Statistic:
+    """
+    A statistic that can be computed for one sample, like any function
+    passed to the simulation functions, or for many samples at once.
+    bootstrap_statistic and simulate_sample_statistic recognize these
+    and compute them for many samples with a single call.
+
+    Statistics can be combined with +, -, *, / and abs.  For example,
+    abs(stat_proportion('heads') - 0.5) is how far the proportion of
+    heads in a sample is from one half.
+    """
+
+    def __init__(self, compute_for_samples, name):
+        """
+        compute_for_samples takes a 2-D array with one sample per row and
+        returns an array with the statistic for each row.
+        """
+        self._compute_for_samples = compute_for_samples
+        self.__name__ = name
+
+    def __call__(self, sample):
+        return self._compute_for_samples(np.asarray(sample)[np.newaxis])[0]
+
+    def for_samples(self, samples):
+        """
+        Return an array of the statistic for each row of the 2-D array samples.
+        """
+        return self._compute_for_samples(np.asarray(samples))
+
+    def __repr__(self):
+        return self.__name__
+
+    def _combine(self, other, op, symbol, reverse=False):
+        if isinstance(other, Statistic):
+            compute_other, other_name = other._compute_for_samples, other.__name__
+        else:
+            compute_other, other_name = (lambda samples: other), repr(other)
+
+        if reverse:
+            compute = lambda samples: op(
+                compute_other(samples), self.for_samples(samples)
+            )
+            name = "(" + other_name + " " + symbol + " " + self.__name__ + ")"
+        else:
+            compute = lambda samples: op(
+                self.for_samples(samples), compute_other(samples)
+            )
+            name = "(" + self.__name__ + " " + symbol + " " + other_name + ")"
+        return Statistic(compute, name)
+
+    def __add__(self, other):
+        return self._combine(other, np.add, "+")
+
+    def __radd__(self, other):
+        return self._combine(other, np.add, "+", reverse=True)
+
+    def __sub__(self, other):
+        return self._combine(other, np.subtract, "-")
+
+    def __rsub__(self, other):
+        return self._combine(other, np.subtract, "-", reverse=True)
+
+    def __mul__(self, other):
+        return self._combine(other, np.multiply, "*")
+
+    def __rmul__(self, other):
+        return self._combine(other, np.multiply, "*", reverse=True)
+
+    def __truediv__(self, other):
+        return self._combine(other, np.true_divide, "/")
+
+    def __rtruediv__(self, other):
+        return self._combine(other, np.true_divide, "/", reverse=True)
+
+    def __abs__(self):
+        name = self.__name__
+        if not name.startswith("("):
+            name = "(" + name + ")"
+        return Statistic(
+            lambda samples: np.abs(self.for_samples(samples)), "abs" + name
+        )
+
+    def __neg__(self):
+        return Statistic(
+            lambda samples: -self.for_samples(samples), "-" + self.__name__
+        )
+
+
+stat_mean = Statistic(lambda samples: np.mean(samples, axis=1), "stat_mean")
+stat_median = Statistic(lambda samples: np.median(samples, axis=1), "stat_median")
+stat_sd = Statistic(lambda samples: np.std(samples, axis=1), "stat_sd")
+stat_sum = Statistic(lambda samples: np.sum(samples, axis=1), "stat_sum")
+stat_max = Statistic(lambda samples: np.max(samples, axis=1), "stat_max")
+stat_min = Statistic(lambda samples: np.min(samples, axis=1), "stat_min")
+
+
+@doc_tag(path="inference-library-ref.html")
+def stat_percentile(p):
+    """
+    The statistic computing the pth percentile of a sample, as the
+    datascience percentile function does.
+    """
+    if not 0 <= p <= 100:
+        raise ValueError(
+            "Percentile requires a percent between 0 and 100, not " + str(p)
+        )
+
+    def compute(samples):
+        n = samples.shape[1]
+        rank = 0 if p == 0 else math.ceil((p / 100) * n) - 1
+        return np.partition(samples, rank, axis=1)[:, rank]
+
+    return Statistic(compute, "stat_percentile(" + repr(p) + ")")
+
+
+@doc_tag(path="inference-library-ref.html")
+def stat_count(value):
+    """
+    The statistic counting how many elements of a sample equal value.
+    """
+    return Statistic(
+        lambda samples: np.count_nonzero(samples == value, axis=1),
+        "stat_count(" + repr(value) + ")",
+    )
+
+
+@doc_tag(path="inference-library-ref.html")
+def stat_proportion(value):
+    """
+    The statistic computing the proportion of a sample's elements equal
+    to value.
+    """
+    return Statistic(
+        lambda samples: np.count_nonzero(samples == value, axis=1) / samples.shape[1],
+        "stat_proportion(" + repr(value) + ")",
+    )
+
+
+@doc_tag(path="inference-library-ref.html")
+def stat_tvd(categories, model_proportions):
+    """
+    The statistic computing the total variation distance between the
+    proportions of each of the categories in a sample and the
+    model_proportions for those categories.
+    """
+    categories = np.asarray(categories)
+    model_proportions = np.asarray(model_proportions)
+    if len(categories) != len(model_proportions):
+        raise ValueError(
+            "stat_tvd needs one model proportion for each category, but there are {} categories and {} proportions".format(
+                len(categories), len(model_proportions)
+            )
+        )
+
+    def compute(samples):
+        counts = np.count_nonzero(samples[:, :, np.newaxis] == categories, axis=1)
+        proportions = counts / samples.shape[1]
+        return np.sum(np.abs(proportions - model_proportions), axis=1) / 2
+
+    names = ", ".join(str(category) for category in categories)
+    return Statistic(compute, "stat_tvd([" + names + "], ...)")
+
+
+@doc_tag(path="inference-library-ref.html")
+def stat_distribution_tvd(model_proportions):
+    """
+    The statistic computing the total variation distance between a
+    distribution (an array of proportions, such as the result of
+    sample_proportions) and model_proportions.
+    """
+    model_proportions = np.asarray(model_proportions)
+    return Statistic(
+        lambda distributions: np.sum(np.abs(distributions - model_proportions), axis=1)
+        / 2,
+        "stat_distribution_tvd(...)",
+    )
+
+
+def _batch_statistic(compute_statistic):
+    """
+    If compute_statistic is a Statistic or a reducer we know how to apply
+    to every row of a 2-D array of samples in one call, return a function
+    doing that.  Otherwise, return None.  The lookup happens at call time
+    because docs.py replaces np.mean and friends with wrappers when the
+    package loads.
+    """
+    if isinstance(compute_statistic, Statistic):
+        return compute_statistic.for_samples
+
+    reducers = [
+        (np.mean, lambda samples: np.mean(samples, axis=1)),
+        (np.median, lambda samples: np.median(samples, axis=1)),
+        (np.std, lambda samples: np.std(samples, axis=1)),
+        (np.var, lambda samples: np.var(samples, axis=1)),
+        (np.sum, lambda samples: np.sum(samples, axis=1)),
+        (np.max, lambda samples: np.max(samples, axis=1)),
+        (np.min, lambda samples: np.min(samples, axis=1)),
+        (max, lambda samples: np.max(samples, axis=1)),
+        (min, lambda samples: np.min(samples, axis=1)),
+    ]
+    for reducer, batched in reducers:
+        if compute_statistic is reducer:
+            return batched
+    return None
+
+
+def _append_statistics(samples, compute_statistic, batch_statistic, statistics):
+    """
+    Append the statistic for each sample in the list samples to statistics,
+    computing them all with one call to batch_statistic if the samples are
+    1-D arrays of the same (non-zero) length.  Only Statistic objects are
+    batched for samples that are not numbers, since reducers such as max
+    must compare strings one sample at a time.
+    """
+    shapes = set(np.shape(sample) for sample in samples)
+    if len(shapes) == 1:
+        shape = shapes.pop()
+        if len(shape) == 1 and shape[0] > 0:
+            batch = np.array(samples)
+            if isinstance(compute_statistic, Statistic) or batch.dtype.kind in "biuf":
+                statistics.append(batch_statistic(batch))
+                return
+    for sample in samples:
+        statistics.append(compute_statistic(sample))
+
 
 ###
 
 
 @doc_tag(path="inference-library-ref.html")
-def simulate(make_one_outcome, num_trials):
+def simulate(
+    make_one_outcome,
+    num_trials,
+    workers=None,
+    seed=None,
+    summarize=False,
+    observed_statistic=None,
+    progress=False,
+    checkpoint=None,
+    dtype=float,
+):
     """
     Return an array of num_trials values, each
     of which was created by calling make_one_outcome().
+
+    Pass workers to split the trials across that many processes, and seed
+    (an int or np.random.Generator) to make the results reproducible.  The
+    same seed gives the same results for any number of workers.
+
+    For very large numbers of trials, pass summarize=True to get back a
+    SimulationSummary instead of an array.  Include the observed_statistic
+    if you will want its empirical_pvalue.
+
+    Pass progress=True to show a progress bar with the trials per second
+    and the time remaining, or a function to call with the same numbers,
+    as in progress(completed, num_trials, trials_per_second, seconds_left).
+    Interrupting the simulation returns the outcomes of the trials run so far.
+
+    For very long simulations, pass checkpoint="name.npy" to save the
+    outcomes to that file as they are computed, along with the seed.  If the
+    simulation is stopped, calling simulate again with the same checkpoint
+    continues where it left off.  Each outcome must be a single number.
+    Other notebooks can read the outcomes with np.load("name.npy", mmap_mode="r").
+
+    Pass dtype=np.float32 to store the outcomes in half the memory, or an
+    integer type such as np.int32 when every outcome is a whole number.
     """
-    outcomes = make_array()
-    for i in np.arange(0, num_trials):
-        outcome = make_one_outcome()
-        outcomes = np.append(outcomes, outcome)
+    outcomes = _simulation_results(
+        num_trials, summarize, observed_statistic, checkpoint, seed, dtype
+    )
 
-    return outcomes
+    def run(tracker):
+        if workers is not None or seed is not None or checkpoint is not None:
+            job = functools.partial(_simulate_trials, make_one_outcome)
+            return _run_parallel(job, num_trials, workers, seed, outcomes, tracker)
+        return _simulate_trials(
+            make_one_outcome, num_trials, outcomes=outcomes, progress=tracker
+        )
+
+    return _with_progress(run, num_trials, outcomes, progress)
+
+
+def _simulate_trials(
+    make_one_outcome, num_trials, rng=None, outcomes=None, progress=None
+):
+    # rng is unused: make_one_outcome draws from the global np.random state.
+    if outcomes is None:
+        outcomes = _ResultBuffer(num_trials)
+    for chunk in _trial_chunks(num_trials, progress):
+        for i in np.arange(0, chunk):
+            outcome = make_one_outcome()
+            outcomes.append(outcome)
+
+    return outcomes.result()
 
 
 # @doc_tag(path='inference-library-ref.html')
@@ -68,7 +1033,17 @@ def simulate(make_one_outcome, num_trials):
 
 @doc_tag(path="inference-library-ref.html")
 def simulate_sample_statistic(
-    make_one_sample, sample_size, compute_sample_statistic, num_trials
+    make_one_sample,
+    sample_size,
+    compute_sample_statistic,
+    num_trials,
+    workers=None,
+    seed=None,
+    summarize=False,
+    observed_statistic=None,
+    progress=False,
+    checkpoint=None,
+    dtype=float,
 ):
     """
     Simulates `num_trials` sampling steps and returns an array of the
@@ -84,40 +1059,262 @@ def simulate_sample_statistic(
                          The return value should be a single numerical value.
 
     * num_trials: the number of simulation steps to perform.
+
+    * workers: optional number of processes to split the trials across.
+
+    * seed: optional int or np.random.Generator making the results
+            reproducible for any number of workers.
+
+    * summarize: if True, return a SimulationSummary instead of an array.
+
+    * observed_statistic: when summarizing, the observed statistic whose
+                          empirical_pvalue you will want.
+
+    * progress: True to show a progress bar, or a function to call as
+                progress(completed, num_trials, trials_per_second, seconds_left).
+
+    * checkpoint: optional .npy file to save the statistics to as they are
+                  computed.  Running the simulation again with the same
+                  checkpoint continues where it left off.
+
+    * dtype: the type of the returned array, such as np.float32 to use half
+             the memory, or an integer type for counts.
+
+    Interrupting the simulation returns the statistics for the trials run so far.
+    """
+    simulated_statistics = _simulation_results(
+        num_trials, summarize, observed_statistic, checkpoint, seed, dtype
+    )
+
+    def run(tracker):
+        if workers is not None or seed is not None or checkpoint is not None:
+            job = functools.partial(
+                _simulate_sample_statistic_trials,
+                make_one_sample,
+                sample_size,
+                compute_sample_statistic,
+            )
+            return _run_parallel(
+                job, num_trials, workers, seed, simulated_statistics, tracker
+            )
+        return _simulate_sample_statistic_trials(
+            make_one_sample,
+            sample_size,
+            compute_sample_statistic,
+            num_trials,
+            simulated_statistics=simulated_statistics,
+            progress=tracker,
+        )
+
+    return _with_progress(run, num_trials, simulated_statistics, progress)
+
+
+def _simulate_sample_statistic_trials(
+    make_one_sample,
+    sample_size,
+    compute_sample_statistic,
+    num_trials,
+    rng=None,
+    simulated_statistics=None,
+    progress=None,
+):
+    # rng is unused: make_one_sample draws from the global np.random state.
+    if simulated_statistics is None:
+        simulated_statistics = _ResultBuffer(num_trials)
+
+    # Fast path: gather samples and compute their statistics in batches.
+    batch_statistic = _batch_statistic(compute_sample_statistic)
+    if batch_statistic is not None:
+        rows_per_batch = max(1, _MAX_BATCH_ELEMENTS // max(int(sample_size), 1))
+        for chunk in _trial_chunks(num_trials, progress):
+            samples = []
+            for i in np.arange(0, chunk):
+                samples.append(make_one_sample(sample_size))
+                if len(samples) == rows_per_batch:
+                    _append_statistics(
+                        samples,
+                        compute_sample_statistic,
+                        batch_statistic,
+                        simulated_statistics,
+                    )
+                    samples = []
+            _append_statistics(
+                samples, compute_sample_statistic, batch_statistic, simulated_statistics
+            )
+        return simulated_statistics.result()
+
+    for chunk in _trial_chunks(num_trials, progress):
+        for i in np.arange(0, chunk):
+            simulated_sample = make_one_sample(sample_size)
+            sample_statistic = compute_sample_statistic(simulated_sample)
+            simulated_statistics.append(sample_statistic)
+    return simulated_statistics.result()
+
+
+@doc_tag(path="inference-library-ref.html")
+def simulate_proportions(
+    sample_size,
+    model_proportions,
+    num_trials,
+    compute_statistic=None,
+    seed=None,
+    dtype=float,
+):
     """
+    Simulates `num_trials` samples of `sample_size` draws from a categorical
+    distribution, drawing all of the samples at once.  The parameters are:
+
+    * sample_size: the number of draws in each sample.
+
+    * model_proportions: the probability of each category, as an array
+                         that sums to 1.
+
+    * num_trials: the number of samples to draw.
+
+    * compute_statistic: optional function that takes the array of
+                         proportions for one sample and returns a
+                         statistic, such as
+                         stat_distribution_tvd(model_proportions).
+
+    * seed: optional int or np.random.Generator making the results
+            reproducible.
+
+    * dtype: the type of the returned array, such as np.float32 to use
+             half the memory.
 
-    simulated_statistics = make_array()
-    for i in np.arange(0, num_trials):
-        simulated_sample = make_one_sample(sample_size)
-        sample_statistic = compute_sample_statistic(simulated_sample)
-        simulated_statistics = np.append(simulated_statistics, sample_statistic)
-    return simulated_statistics
+    With compute_statistic, returns the same array of statistics as
+
+        simulate(lambda: compute_statistic(sample_proportions(sample_size, model_proportions)), num_trials)
+
+    but much faster when compute_statistic is a Statistic.  Without it,
+    returns a 2-D array with the proportions for each sample in a row.
+    """
+    rng = _generator(seed)
+    model_proportions = np.asarray(model_proportions)
+    num_categories = len(model_proportions)
+    num_trials = int(num_trials)
+
+    if compute_statistic is None:
+        proportions = np.empty((num_trials, num_categories), dtype=dtype)
+    else:
+        statistics = _ResultBuffer(num_trials, dtype)
+        batch_statistic = _batch_statistic(compute_statistic)
+
+    rows_per_batch = max(1, _MAX_BATCH_ELEMENTS // max(num_categories, 1))
+    start = 0
+    while start < num_trials:
+        rows = min(rows_per_batch, num_trials - start)
+        if rng is None:
+            counts = np.random.multinomial(sample_size, model_proportions, size=rows)
+        else:
+            counts = rng.multinomial(sample_size, model_proportions, size=rows)
+        batch = counts / sample_size
+
+        if compute_statistic is None:
+            proportions[start : start + rows] = _as_dtype(batch, dtype)
+        elif batch_statistic is not None:
+            statistics.append(batch_statistic(batch))
+        else:
+            for row in batch:
+                statistics.append(compute_statistic(row))
+        start += rows
+
+    if compute_statistic is None:
+        return proportions
+    return statistics.result()
 
 
 @doc_tag(path="inference-library-ref.html")
-def empirical_pvalue(null_statistics, observed_statistic):
+def empirical_pvalue(null_statistics, observed_statistic, tail="right"):
     """
     Return the proportion of the null statistics that are greater than
     or equal to the observed statistic.
+
+    Pass tail="left" for the proportion that are less than or equal to
+    the observed statistic instead, or tail="two-sided" for twice the
+    smaller of those two proportions (but at most 1).
+
+    If observed_statistic is an array, the result is an array with the
+    p-value for each of its elements.  This is much faster than calling
+    empirical_pvalue once for each observed statistic.
     """
-    return np.count_nonzero(null_statistics >= observed_statistic) / len(
-        null_statistics
-    )
+    if tail not in ("right", "left", "two-sided"):
+        raise ValueError(
+            'The tail for empirical_pvalue must be "right", "left", or "two-sided", not '
+            + repr(tail)
+        )
+
+    if isinstance(null_statistics, SimulationSummary):
+        return null_statistics.empirical_pvalue(observed_statistic, tail)
+
+    null_statistics = np.asarray(null_statistics)
+    observed = np.asarray(observed_statistic)
+
+    # Null statistics stored as float32 are rounded, so round the observed
+    # statistic the same way, or a null statistic computed exactly as the
+    # observed one was might no longer be equal to it.
+    if null_statistics.dtype.kind == "f" and null_statistics.dtype.itemsize < 8:
+        if observed.dtype.kind in "biuf":
+            observed = observed.astype(null_statistics.dtype)
+
+    if observed.ndim == 0:
+        num_trials = len(null_statistics)
+        return _tail_pvalue(
+            np.count_nonzero(null_statistics >= observed) / num_trials,
+            np.count_nonzero(null_statistics <= observed) / num_trials,
+            tail,
+        )
+
+    # Many observed statistics: sort the null statistics once and binary
+    # search for each observed one.  Nans are never >= or <= anything,
+    # so leave them out of the search.
+    ordered = np.sort(null_statistics)
+    if ordered.dtype.kind == "f":
+        ordered = ordered[: len(ordered) - np.count_nonzero(np.isnan(ordered))]
+
+    at_least = len(ordered) - np.searchsorted(ordered, observed, side="left")
+    at_most = np.searchsorted(ordered, observed, side="right")
+    if observed.dtype.kind == "f":
+        at_least = np.where(np.isnan(observed), 0, at_least)
+        at_most = np.where(np.isnan(observed), 0, at_most)
+
+    num_trials = len(null_statistics)
+    return _tail_pvalue(at_least / num_trials, at_most / num_trials, tail)
+
+
+def _tail_pvalue(right, left, tail):
+    """
+    Choose the p-value for the tail from the proportions of null
+    statistics at least as big (right) and at most as big (left) as the
+    observed statistic.
+    """
+    if tail == "right":
+        return right
+    elif tail == "left":
+        return left
+    else:
+        return np.minimum(2 * np.minimum(right, left), 1)
 
 
 ###
 
 
 @doc_tag(path="inference-library-ref.html")
-def permutation_sample(table, group_label):
+def permutation_sample(table, group_label, seed=None):
     """
     Takes a table and the label of a column used to group rows.
     Returns a copy of the table with a new "Shuffled Label" column
     containing the shuffled values from the group column.
+    The optional seed (an int or np.random.Generator) makes the
+    shuffle reproducible.
     """
 
     # array of shuffled labels
-    shuffled_labels = table.sample(with_replacement=False).column(group_label)
+    rng = _generator(seed)
+    if rng is None:
+        shuffled_labels = table.sample(with_replacement=False).column(group_label)
+    else:
+        shuffled_labels = table.column(group_label)[rng.permutation(table.num_rows)]
 
     # table of numerical variable and shuffled labels
     shuffled_table = table.with_column("Shuffled Label", shuffled_labels)
@@ -144,17 +1341,152 @@ def abs_difference_of_means(table, group_label, value_label):
             "these columns: {}".format(value_label, ", ".join(table.labels))
         )
 
-    # table containing group means
-    means_table = table.group(group_label, np.mean)
+    groups = _grouped_columns(table, group_label, value_label)
+    if groups is None:
+        # table containing group means
+        means_table = table.group(group_label, np.mean)
 
-    # array of group means
-    means = means_table.column(value_label + " mean")
+        # array of group means
+        means = means_table.column(value_label + " mean")
+    else:
+        codes, values, num_groups = groups
+        means = _group_means(codes, values, num_groups)
 
     return abs(means.item(0) - means.item(1))
 
 
+def max_difference_of_means(table, group_label, value_label):
+    """
+    Takes a table, the label of the column used to divide rows into
+    any number of groups, and the label of the column storing the values
+    for each row.
+    Returns the largest difference between the mean values of two
+    groups.  With two groups, this is the same as abs_difference_of_means.
+    """
+    if value_label not in table.labels:
+        raise ValueError(
+            'The column "{}" is not in the table. The table contains '
+            "these columns: {}".format(value_label, ", ".join(table.labels))
+        )
+
+    groups = _grouped_columns(table, group_label, value_label)
+    if groups is None:
+        means = table.group(group_label, np.mean).column(value_label + " mean")
+    else:
+        codes, values, num_groups = groups
+        means = _group_means(codes, values, num_groups)
+
+    return max(means) - min(means)
+
+
+######################################################################
+# Grouped statistics: the group column is encoded once as integer codes,
+# and the statistics for each group come from just the value column we
+# need, rather than Table.group, which aggregates every column in the
+# table.
+######################################################################
+
+
+def _grouped_columns(table, group_label, value_label):
+    """
+    Return the group column encoded as codes 0, 1, ..., num_groups - 1 (in
+    the sorted order Table.group uses), the value column, and num_groups,
+    or None if the value column is not numerical or the groups are not
+    simple values.  In that case the caller should fall back on the
+    Table-based code, which also reports any errors.
+    """
+    if group_label not in table.labels or value_label not in table.labels:
+        return None
+    if group_label == value_label or table.num_rows == 0:
+        return None
+
+    values = table.column(value_label)
+    if values.dtype.kind not in "biuf":
+        return None
+
+    # Table.group puts each nan in its own group, and object columns may
+    # not be sortable, so leave those to the Table-based code.
+    groups = table.column(group_label)
+    if groups.dtype.kind == "O" or (
+        groups.dtype.kind == "f" and np.isnan(groups).any()
+    ):
+        return None
+
+    keys, codes = np.unique(groups, return_inverse=True)
+    return codes.reshape(-1), values, len(keys)
+
+
+def _group_means(codes, values, num_groups):
+    """
+    The mean of values in each group.  If codes is 2-D, each row holds a
+    shuffle of the same group codes for a table with the same values, and
+    the result has a row of means for each.  A stable sort puts each
+    group's values together in row order, and np.mean averages them just
+    as Table.group does, so the means are identical to the Table-based
+    code's, down to the last bit.
+    """
+    codes = np.asarray(codes)
+    rows = codes.reshape(-1, codes.shape[-1])
+    grouped = values[np.argsort(rows, axis=1, kind="stable")]
+    counts = np.bincount(rows[0], minlength=num_groups)
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    means = np.column_stack(
+        [np.mean(grouped[:, start:end], axis=1) for start, end in zip(starts, ends)]
+    )
+    return means.reshape(codes.shape[:-1] + (num_groups,))
+
+
+def _abs_difference_of_group_means(means):
+    return np.abs(means[..., 0] - means[..., 1])
+
+
+def _max_difference_of_group_means(means):
+    return np.max(means, axis=-1) - np.min(means, axis=-1)
+
+
+# The statistics simulate_permutation_statistic can compute from the group
+# means, with the fewest groups each one needs.
+_GROUP_MEAN_STATISTICS = {
+    abs_difference_of_means: (_abs_difference_of_group_means, 2),
+    max_difference_of_means: (_max_difference_of_group_means, 1),
+}
+
+
+def _permutation_batches(codes, values, num_groups, statistic, num_trials, rng=None):
+    """
+    Yield arrays holding statistic(means), where means are the group means,
+    for num_trials shuffles of the group codes.  Without an rng, each
+    shuffle comes from np.random.permutation, just as it does in
+    Table.sample, so the results match the Table-based code.
+    """
+    n = len(codes)
+    rows_per_batch = max(1, _MAX_BATCH_ELEMENTS // n)
+    remaining = int(num_trials)
+    while remaining > 0:
+        rows = min(rows_per_batch, remaining)
+        shuffles = _random_permutations(rng, n, rows)
+        means = _group_means(codes[shuffles], values, num_groups)
+        yield statistic(means)
+        remaining -= rows
+
+
+# The most space the cached results of simulate_permutation_statistic
+# take on disk.  A 10,000 trial simulation takes 80KB.
+_PERMUTATION_CACHE_BYTES = 2**28
+
+
 @doc_tag(path="inference-library-ref.html")
-def simulate_permutation_statistic(table, group_label, value_label, num_trials):
+def simulate_permutation_statistic(
+    table,
+    group_label,
+    value_label,
+    num_trials,
+    seed=None,
+    cache=False,
+    compute_statistic=abs_difference_of_means,
+    dtype=float,
+):
     """
     Simulates `num_trials` sampling steps and returns an array of the
     `abs_difference_of_means` statistic for those samples.
@@ -163,7 +1495,8 @@ def simulate_permutation_statistic(table, group_label, value_label, num_trials):
 
     * table:       the Table to which we'll apply a permutation test.
 
-    * group_label: the label of a column used to divide the rows into two groups.
+    * group_label: the label of a column used to divide the rows into groups
+                   (two groups, unless compute_statistic allows more).
 
     * value_label: the label of the column storing the values
                    for each row.  This column should contain numerical
@@ -172,37 +1505,175 @@ def simulate_permutation_statistic(table, group_label, value_label, num_trials):
                    difference in the proportion of 1's in the two groups.
 
     * num_trials:  the number of permutations to compute.
-    """
 
-    sample_statistics = make_array()
-    for i in np.arange(num_trials):
-        one_sample = permutation_sample(table, group_label)
-        sample_statistic = abs_difference_of_means(
-            one_sample, "Shuffled Label", value_label
+    * seed:        optional int or np.random.Generator making the
+                   results reproducible.
+
+    * cache:       if True and seed is an int, save the results on disk
+                   and return the saved results when called again with the
+                   same columns, num_trials, and seed.  Pass a directory
+                   name instead of True to keep the saved results there.
+
+    * compute_statistic: the statistic to compute for each sample, called as
+                   compute_statistic(table, "Shuffled Label", value_label).
+                   Use max_difference_of_means for more than two groups.
+
+    * dtype:       the type of the returned array, such as np.float32 to
+                   use half the memory.
+    """
+    key = None
+    if (
+        cache
+        and compute_statistic in _GROUP_MEAN_STATISTICS
+        and isinstance(seed, (int, np.integer))
+        and group_label in table.labels
+        and value_label in table.labels
+    ):
+        if cache is True:
+            cache = cache_directory("permutation-statistics")
+        results_cache = FileCache(cache, _PERMUTATION_CACHE_BYTES)
+        key = content_hash(
+            "simulate_permutation_statistic",
+            compute_statistic.__name__,
+            table.column(group_label),
+            table.column(value_label),
+            group_label,
+            value_label,
+            int(num_trials),
+            int(seed),
+            np.dtype(dtype).str,
         )
-        sample_statistics = np.append(sample_statistics, sample_statistic)
+        cached = results_cache.get(key + ".npy")
+        if cached is not None:
+            return np.load(io.BytesIO(cached))
+
+    sample_statistics = _permutation_statistics(
+        table, group_label, value_label, num_trials, seed, compute_statistic, dtype
+    )
+
+    if key is not None:
+        data = io.BytesIO()
+        np.save(data, sample_statistics)
+        results_cache.put(key + ".npy", data.getvalue())
     return sample_statistics
 
 
+def _permutation_statistics(
+    table, group_label, value_label, num_trials, seed, compute_statistic, dtype
+):
+    rng = _generator(seed)
+    sample_statistics = _ResultBuffer(num_trials, dtype)
+
+    # Fast path: shuffle the group codes rather than building Tables for
+    # each trial, and compute the group means for many trials at once.
+    groups = _grouped_columns(table, group_label, value_label)
+    if groups is not None and compute_statistic in _GROUP_MEAN_STATISTICS:
+        codes, values, num_groups = groups
+        statistic, min_groups = _GROUP_MEAN_STATISTICS[compute_statistic]
+        if num_groups >= min_groups:
+            for batch in _permutation_batches(
+                codes, values, num_groups, statistic, num_trials, rng
+            ):
+                sample_statistics.append(batch)
+            return sample_statistics.result()
+
+    for i in np.arange(num_trials):
+        one_sample = permutation_sample(table, group_label, rng)
+        sample_statistic = compute_statistic(one_sample, "Shuffled Label", value_label)
+        sample_statistics.append(sample_statistic)
+    return sample_statistics.result()
+
+
 ######################################################################
 # Bootstrapping: generic code that can be resued
 ######################################################################
 
 
+def _bootstrap_batches(observed_sample, batch_statistic, num_trials, rng=None):
+    """
+    Yield arrays holding the statistic for num_trials resamples of
+    observed_sample, drawing the resample indices for many trials at once.
+    Without an rng, the indices come from the same random stream, in the
+    same order, as calling np.random.choice once per trial.
+    """
+    n = len(observed_sample)
+    rows_per_batch = max(1, _MAX_BATCH_ELEMENTS // n)
+    remaining = int(num_trials)
+    while remaining > 0:
+        rows = min(rows_per_batch, remaining)
+        indices = _random_indices(rng, n, (rows, n))
+        yield batch_statistic(observed_sample[indices])
+        remaining -= rows
+
+
 @doc_tag(path="inference-library-ref.html")
 def confidence_interval(ci_percent, statistics):
     """
     Return an array with the lower and upper bound of the ci_percent confidence interval.
+
+    If statistics is a 2-D array, each column is treated as a separate
+    set of statistics, and the result has one row [lower, upper] for each
+    column.  For example, confidence_interval(95, bootstrap_regression(...))
+    gives the intervals for the slope and the intercept.
     """
     # percent in each of the the left/right tails
     percent_in_each_tail = (100 - ci_percent) / 2
+    if isinstance(statistics, SimulationSummary):
+        left = statistics.percentile(percent_in_each_tail)
+        right = statistics.percentile(100 - percent_in_each_tail)
+        return make_array(left, right)
+
+    values = np.asarray(statistics)
+    bounds = _percentiles([percent_in_each_tail, 100 - percent_in_each_tail], values)
+    if bounds is not None:
+        return bounds.T
+
+    if values.ndim == 2:
+        return np.array(
+            [confidence_interval(ci_percent, column) for column in values.T]
+        )
+
     left = percentile(percent_in_each_tail, statistics)
     right = percentile(100 - percent_in_each_tail, statistics)
     return make_array(left, right)
 
 
+def _percentiles(percents, values):
+    """
+    Return an array of the given percentiles of the numerical array values,
+    using the same definition as the datascience percentile function, but
+    selecting all of them with one np.partition rather than sorting once
+    per percentile.  If values is 2-D, the percentiles of each column are
+    computed, giving one column of results for each column of values.
+    Returns None for cases we leave to datascience, including invalid
+    percents, so it can report them.
+    """
+    if values.ndim not in (1, 2) or len(values) == 0:
+        return None
+    if values.dtype.kind not in "biuf":
+        return None
+    if values.dtype.kind == "f" and np.isnan(values).any():
+        return None  # sorted() orders nans differently than np.partition
+    if not all(0 <= p <= 100 for p in percents):
+        return None
+
+    # sorted(values)[ranks[i]] is the percents[i] percentile
+    ranks = [0 if p == 0 else math.ceil((p / 100) * len(values)) - 1 for p in percents]
+    selected = np.partition(values, ranks, axis=0)
+    return selected[ranks]
+
+
 @doc_tag(path="inference-library-ref.html")
-def bootstrap_statistic(observed_sample, compute_statistic, num_trials):
+def bootstrap_statistic(
+    observed_sample,
+    compute_statistic,
+    num_trials,
+    workers=None,
+    seed=None,
+    progress=False,
+    checkpoint=None,
+    dtype=float,
+):
     """
     Creates num_trials resamples of the initial sample.
     Returns an array of the provided statistic for those samples.
@@ -215,6 +1686,28 @@ def bootstrap_statistic(observed_sample, compute_statistic, num_trials):
 
     * num_trials: the number of bootstrap samples to create.
 
+    * workers: optional number of processes to split the resamples across.
+
+    * seed: optional int or np.random.Generator making the results
+            reproducible for any number of workers.
+
+    * progress: True to show a progress bar, or a function to call as
+                progress(completed, num_trials, trials_per_second, seconds_left).
+
+    * checkpoint: optional .npy file to save the statistics to as they are
+                  computed.  Running bootstrap_statistic again with the same
+                  checkpoint continues where it left off.
+
+    * dtype: the type of the returned array, such as np.float32 to use half
+             the memory, or an integer type for counts.
+
+    Interrupting the resampling returns the statistics for the resamples
+    made so far.
+
+    Common statistics (np.mean, np.median, np.std, np.var, np.sum, np.max,
+    np.min) and Statistic objects such as stat_proportion('heads') are
+    computed for many resamples at once, which is much faster than calling
+    compute_statistic once per resample.
     """
 
     # Check that observed_sample is an array!
@@ -224,16 +1717,72 @@ def bootstrap_statistic(observed_sample, compute_statistic, num_trials):
             + str(type(observed_sample).__name__)
         )
 
-    statistics = make_array()
+    statistics = _simulation_results(
+        num_trials, checkpoint=checkpoint, seed=seed, dtype=dtype
+    )
+
+    def run(tracker):
+        if workers is not None or seed is not None or checkpoint is not None:
+            job = functools.partial(
+                _bootstrap_trials, observed_sample, compute_statistic
+            )
+            return _run_parallel(job, num_trials, workers, seed, statistics, tracker)
+        return _bootstrap_trials(
+            observed_sample,
+            compute_statistic,
+            num_trials,
+            statistics=statistics,
+            progress=tracker,
+        )
 
-    for i in np.arange(0, num_trials):
-        # Key: in bootstrapping we must always sample with replacement
-        simulated_resample = np.random.choice(observed_sample, len(observed_sample))
+    return _with_progress(run, num_trials, statistics, progress)
 
-        resample_statistic = compute_statistic(simulated_resample)
-        statistics = np.append(statistics, resample_statistic)
 
-    return statistics
+def _bootstrap_trials(
+    observed_sample,
+    compute_statistic,
+    num_trials,
+    rng=None,
+    statistics=None,
+    progress=None,
+):
+    if statistics is None:
+        statistics = _ResultBuffer(num_trials)
+
+    # Fast path: compute common statistics for many resamples at once.
+    # The reducers only batch numbers: max and min of strings, for
+    # instance, must compare them one resample at a time.
+    batch_statistic = _batch_statistic(compute_statistic)
+    if (
+        batch_statistic is not None
+        and observed_sample.ndim == 1
+        and len(observed_sample) > 0
+        and (
+            isinstance(compute_statistic, Statistic)
+            or observed_sample.dtype.kind in "biuf"
+        )
+    ):
+        for batch in _bootstrap_batches(
+            observed_sample, batch_statistic, num_trials, rng
+        ):
+            statistics.append(batch)
+            if progress is not None:
+                progress.advance(len(batch))
+        return statistics.result()
+
+    for chunk in _trial_chunks(num_trials, progress):
+        for i in np.arange(0, chunk):
+            # Key: in bootstrapping we must always sample with replacement
+            n = len(observed_sample)
+            if rng is None:
+                simulated_resample = np.random.choice(observed_sample, n)
+            else:
+                simulated_resample = rng.choice(observed_sample, n)
+
+            resample_statistic = compute_statistic(simulated_resample)
+            statistics.append(resample_statistic)
+
+    return statistics.result()
 
 
 ######################################################################
@@ -241,6 +1790,70 @@ def bootstrap_statistic(observed_sample, compute_statistic, num_trials):
 ######################################################################
 
 
+def _float_column(values, label):
+    """
+    Return the values of the column label as a float array.  Columns that
+    are not numerical, including strings that look like numbers, raise a
+    TypeError, just as computing with them would: they should be cleaned
+    with take_clean first.
+    """
+    if values.dtype.kind not in "biuf":
+        raise TypeError(
+            f'The column "{label}" must contain numbers, not values of type '
+            + str(values.dtype)
+            + ".  Use take_clean to convert it."
+        )
+    return values.astype(float)
+
+
+class _RegressionData:
+    """
+    The x and y columns of a table as float arrays, along with the
+    summary statistics the regression functions need.
+    """
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.x_mean = np.mean(self.x)
+        self.y_mean = np.mean(self.y)
+        x_deviations = self.x - self.x_mean
+        y_deviations = self.y - self.y_mean
+        self.var_x = np.mean(x_deviations**2)
+        self.var_y = np.mean(y_deviations**2)
+        self.cov_xy = np.mean(x_deviations * y_deviations)
+
+
+# Students usually call pearson_correlation, linear_regression, residuals,
+# r2_score, and the plotting functions on the same columns one after
+# another, so we keep the data for the last few (table, x, y) combinations.
+_REGRESSION_CACHE_SIZE = 8
+_regression_cache = OrderedDict()
+
+
+def _regression_data(table, x_label, y_label):
+    """
+    Return the _RegressionData for the table's x_label and y_label columns.
+    A cached entry is reused only if it was built from the same column
+    arrays, so replacing a column in the table invalidates it.  (Changing
+    individual elements of a column array in place does not.)
+    """
+    x = table.column(x_label)
+    y = table.column(y_label)
+    key = (id(table), x_label, y_label)
+
+    entry = _regression_cache.get(key)
+    if entry is not None and entry[0] is x and entry[1] is y:
+        _regression_cache.move_to_end(key)
+        return entry[2]
+
+    data = _RegressionData(_float_column(x, x_label), _float_column(y, y_label))
+    _regression_cache[key] = (x, y, data)
+    if len(_regression_cache) > _REGRESSION_CACHE_SIZE:
+        _regression_cache.popitem(last=False)
+    return data
+
+
 @doc_tag(path="inference-library-ref.html")
 def pearson_correlation(table, x_label, y_label):
     """
@@ -248,13 +1861,8 @@ def pearson_correlation(table, x_label, y_label):
     and strength of the association between the given columns in the
     table.
     """
-    x = table.column(x_label)
-    y = table.column(y_label)
-    x_mean = np.mean(x)
-    y_mean = np.mean(y)
-    numerator = sum((x - x_mean) * (y - y_mean))
-    denominator = np.sqrt(sum((x - x_mean) ** 2)) * np.sqrt(sum((y - y_mean) ** 2))
-    return numerator / denominator
+    data = _regression_data(table, x_label, y_label)
+    return data.cov_xy / (np.sqrt(data.var_x) * np.sqrt(data.var_y))
 
 
 @doc_tag(path="inference-library-ref.html")
@@ -273,13 +1881,13 @@ def mean_squared_error(table, x_label, y_label, a, b):
     intercept b when used to fit the data in the tables x_label and y_label
     columns.
     """
-    y_hat = line_predictions(a, b, table.column(x_label))
-    residual = table.column(y_label) - y_hat
+    data = _regression_data(table, x_label, y_label)
+    residual = data.y - line_predictions(a, b, data.x)
     return np.mean(residual**2)
 
 
 @doc_tag(path="inference-library-ref.html")
-def linear_regression(table, x_label, y_label):
+def linear_regression(table, x_label, y_label, method="exact"):
     """
     Return an array containing the slope and intercept of the line best fitting
     the table's data according to the mean square error loss function.  Example:
@@ -291,8 +1899,23 @@ def linear_regression(table, x_label, y_label):
     OR
 
     a,b = linear_regression(fortis, 'Beak length, mm', 'Beak depth, mm')
+
+    By default, the line is computed directly with the least squares
+    formulas.  Pass method="minimize" to search for it with `minimize`
+    instead, as we do in lecture.
     """
 
+    if method == "exact":
+        data = _regression_data(table, x_label, y_label)
+        a, b = _least_squares_lines(data.x, data.y)
+        return make_array(a, b)
+
+    if method != "minimize":
+        raise ValueError(
+            'The method for linear_regression must be "exact" or "minimize", not '
+            + repr(method)
+        )
+
     # A helper function that takes *only* the two variables we need to optimize.
     # This is necessary to use minimize below, because the function we want
     # to minimize cannot take any parameters beyond those it will solve for.
@@ -304,6 +1927,66 @@ def linear_regression(table, x_label, y_label):
     return minimize(mse_for_a_b)
 
 
+def _least_squares_lines(x, y):
+    """
+    Return the slope and intercept minimizing the mean squared error for
+    the x and y arrays.  If x and y are 2-D, each row is a separate data
+    set and the result is an array of slopes and an array of intercepts.
+    If all the x values are the same, any line through their mean is a
+    best fit, and we use the horizontal one.
+    """
+    x_mean = np.mean(x, axis=-1)
+    y_mean = np.mean(y, axis=-1)
+    x_deviations = x - np.expand_dims(x_mean, -1)
+    y_deviations = y - np.expand_dims(y_mean, -1)
+    sum_xx = np.sum(x_deviations**2, axis=-1)
+    sum_xy = np.sum(x_deviations * y_deviations, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a = np.where(sum_xx == 0, 0.0, sum_xy / sum_xx)[()]
+    b = y_mean - a * x_mean
+    return a, b
+
+
+@doc_tag(path="inference-library-ref.html")
+def bootstrap_regression(table, x_label, y_label, num_trials, seed=None):
+    """
+    Creates num_trials resamples of the table's rows, and returns an
+    array with one row per resample holding the slope and intercept of
+    the regression line for that resample.  Example:
+
+    lines = bootstrap_regression(fortis, 'Beak length, mm', 'Beak depth, mm', 1000)
+    slopes = lines[:, 0]
+    intercepts = lines[:, 1]
+    confidence_interval(95, slopes)
+
+    or confidence_interval(95, lines) for both intervals at once.
+
+    This gives the same lines as calling linear_regression on num_trials
+    calls to table.sample(), but computes many of them at once.  The
+    optional seed (an int or np.random.Generator) makes the results
+    reproducible.
+    """
+    x = _float_column(table.column(x_label), x_label)
+    y = _float_column(table.column(y_label), y_label)
+    n = len(x)
+    if n == 0:
+        raise ValueError("Cannot bootstrap a regression line for an empty table.")
+
+    rng = _generator(seed)
+    lines = np.empty((int(num_trials), 2))
+    rows_per_batch = max(1, _MAX_BATCH_ELEMENTS // n)
+    start = 0
+    while start < len(lines):
+        rows = min(rows_per_batch, len(lines) - start)
+        # The same draws as table.sample(), which resamples with replacement
+        indices = _random_indices(rng, n, (rows, n))
+        a, b = _least_squares_lines(x[indices], y[indices])
+        lines[start : start + rows, 0] = a
+        lines[start : start + rows, 1] = b
+        start += rows
+    return lines
+
+
 @doc_tag(path="inference-library-ref.html")
 def residuals(table, x_label, y_label, a, b):
     """
@@ -311,10 +1994,9 @@ def residuals(table, x_label, y_label, a, b):
     where y_hat are the predictions from the line characterized by
     y = ax+b
     """
-    x = table.column(x_label)
-    y = table.column(y_label)
-    y_hat = line_predictions(a, b, x)
-    residual = y - y_hat
+    data = _regression_data(table, x_label, y_label)
+    y_hat = line_predictions(a, b, data.x)
+    residual = data.y - y_hat
     return residual
 
 
@@ -324,11 +2006,10 @@ def r2_score(table, x_label, y_label, a, b):
     R-squared score (also called the "coefficient of determination")
     for the predictions given y=ax+b
     """
+    data = _regression_data(table, x_label, y_label)
     residual = residuals(table, x_label, y_label, a, b)
-    numerator = sum(residual**2)
-    y = table.column(y_label)
-    y_mean = np.mean(y)
-    denominator = sum((y - y_mean) ** 2)
+    numerator = np.sum(residual**2)
+    denominator = len(data.y) * data.var_y
     return 1 - numerator / denominator
 
 
@@ -347,8 +2028,8 @@ def plot_scatter_with_line(table, x_label, y_label, a, b):
         x_label, y_label, title="a = " + str(round(a, 3)) + "; b = " + str(round(b, 3))
     )
 
-    x = table.column(x_label)
-    xlims = make_array(min(x), max(x))
+    x = _regression_data(table, x_label, y_label).x
+    xlims = make_array(np.min(x), np.max(x))
     plot.line(xlims, a * xlims + b, lw=2, color="C0")
 
     return plot
@@ -364,7 +2045,7 @@ def plot_residuals(table, x_label, y_label, a, b):
     """
     x = table.column(x_label)
     residual = residuals(table, x_label, y_label, a, b)
-    largest_residual = abs(max(residual))
+    largest_residual = abs(np.max(residual))
     residual_table = Table().with_columns(x_label, x, "residuals", residual)
     plot = residual_table.scatter(
         x_label,
@@ -402,6 +2083,22 @@ def plot_regression_and_residuals(table, x_label, y_label, a, b, figure=None):
 ######################################################################
 
 
+def _mean_squared_errors(data, a, b):
+    """
+    Return the mean squared error of the lines with slopes a and intercepts
+    b for the _RegressionData data, where a and b may be arrays of any
+    (matching) shape.  Expanding the squared residual around the means of
+    x and y gives
+
+        mse = var(y) - 2 a cov(x, y) + a^2 var(x) + (mean(y) - a mean(x) - b)^2
+
+    so each line costs a few arithmetic operations, no matter how many
+    points there are.
+    """
+    offset = data.y_mean - a * data.x_mean - b
+    return data.var_y - 2 * a * data.cov_xy + a**2 * data.var_x + offset**2
+
+
 def plot_regression_line_and_mse_heat(
     table, x_label, y_label, a, b, show_mse=None, a_space=None, b_space=None, _fig=None
 ):
@@ -415,11 +2112,9 @@ def plot_regression_line_and_mse_heat(
     if b_space is None:
         b_space = np.linspace(-10 * b, 10 * b, 200)
     a_space, b_space = np.meshgrid(a_space, b_space)
-    broadcasted = np.broadcast(a_space, b_space)
-    mses = np.empty(broadcasted.shape)
-    mses.flat = [
-        mean_squared_error(table, x_label, y_label, a, b) for (a, b) in broadcasted
-    ]
+    mses = _mean_squared_errors(
+        _regression_data(table, x_label, y_label), a_space, b_space
+    )
 
     if _fig is None:
         _fig = Figure(1, 2)
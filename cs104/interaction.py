@@ -17,22 +17,34 @@ __all__ = [
     "html_interact",
 ]
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
 from numbers import Integral
+import base64
+import gzip
+import io
 import os
+import pickle
 import json
 import textwrap
-from IPython.display import display, HTML
+from IPython.core.getipython import get_ipython
+from IPython.display import display, HTML, Image
 import ipywidgets
 import numpy as np
 import uuid
 import itertools
+import math
 import matplotlib.pyplot as plt
+import PIL.Image
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from datascience import Table, Plot, Figure
 from abc import ABC, abstractmethod
 
 
+from .cache import FileCache, cache_directory, content_hash
 from .docs import doc_tag
+from .workers import seed_global_random, worker_context
 import inspect
 
 counter = 0
@@ -335,45 +347,234 @@ def create_csv_line(values):
     return ",".join(escape_and_quote(value) for value in values)
 
 
-def _permutations(f, kwargs):
-    # def image_height(v):
-    #     if (v == None and plt.get_fignums()) or type(v) == Plot or type(v) == Figure:
-    #         fig = plt.gcf()
-    #         fig.set_tight_layout(True)
-    #         size = fig.get_size_inches() * fig.dpi  # size in pixels
-    #         return size[1]
-    #     else:
-    #         return None
-    
-    def htmlify(v):
-        if (v == None and plt.get_fignums()) or type(v) == Plot or type(v) == Figure:
-            fig = plt.gcf()
-            fig.set_tight_layout(True)
-            fid = uuid()
-
-            os.makedirs("images", exist_ok=True)
-            prefix = os.getenv("LECTURE_NAME", "ex")
-            filename = f"images/{prefix}-image-{fid}.png"
-
-            with open(filename, "wb") as f:
-                plt.savefig(f, format="png")
-            size = fig.get_size_inches() * fig.dpi  # size in pixels
-
-            plt.close("all")
-            return filename, size[1]
-
-        if hasattr(v, "_repr_html_"):
-            return v._repr_html_(), None  # yep, fancy format!
-        else:
-            return f"<pre>{v}</pre>", None
+def _render(v):
+    """
+    Render the result v of the function passed to html_interact.  Returns
+    ("image", png, height) if the function made a plot, where png is the
+    image's bytes and height is its height in pixels, and ("html", html,
+    None) otherwise.  The plot is drawn with its own Agg canvas rather than
+    through pyplot, and all figures are closed afterwards.
+    """
+    if (v is None and plt.get_fignums()) or type(v) == Plot or type(v) == Figure:
+        fig = plt.gcf()
+        fig.set_tight_layout(True)
+        png = io.BytesIO()
+        FigureCanvasAgg(fig).print_png(png)
+        size = fig.get_size_inches() * fig.dpi  # size in pixels
+
+        plt.close("all")
+        return "image", png.getvalue(), size[1]
+
+    if hasattr(v, "_repr_html_"):
+        return "html", v._repr_html_(), None  # yep, fancy format!
+    else:
+        return "html", f"<pre>{v}</pre>", None
+
+
+@contextmanager
+def _rendering():
+    """
+    Turn off plotting and make tables bigger while computing the function.
+    Add any other special cases about displaying output here.
+    """
+    with plt.ioff():
+        max_str_rows = Table.max_str_rows
+        try:
+            Table.max_str_rows = 30
+            yield
+        finally:
+            Table.max_str_rows = max_str_rows
+
+
+def _save_image(png, fid=None):
+    """
+    Save the png bytes in the images directory and return the file name,
+    which ends with fid, or a new uid if fid is None.
+    """
+    if fid is None:
+        fid = uuid()
+
+    os.makedirs("images", exist_ok=True)
+    prefix = os.getenv("LECTURE_NAME", "ex")
+    filename = f"images/{prefix}-image-{fid}.png"
+
+    with open(filename, "wb") as f:
+        f.write(png)
+    return filename
+
+
+# The most space html_interact's saved frames take: images go in the
+# images directory next to the notebook, and html in the user's cache.
+_IMAGE_CACHE_BYTES = 2**28
+_HTML_CACHE_BYTES = 2**26
+
+
+def _fingerprint(value, seen=None):
+    """
+    Return a hash identifying value for the render cache.  A function is
+    identified by its source, its bytecode, and the values of the variables
+    it uses from enclosing functions and the notebook, so changing any of
+    them gives a new hash.  Other values are identified by their pickled
+    bytes when they can be pickled, and by their repr otherwise.
+    """
+    if seen is None:
+        seen = set()
+    if inspect.isfunction(value):
+        if id(value) in seen:
+            return content_hash("recursive", value.__qualname__)
+        seen.add(id(value))
+        try:
+            source = inspect.getsource(value)
+        except (OSError, TypeError):
+            source = None
+        try:
+            variables = inspect.getclosurevars(value)
+        except (TypeError, ValueError):
+            # No way to know what the function depends on, so never reuse it.
+            return content_hash("unknown", id(value), uuid())
+        used = variables.nonlocals | variables.globals
+        return content_hash(
+            "function",
+            value.__qualname__,
+            source,
+            _code_fingerprint(value.__code__),
+            _fingerprint(value.__defaults__, seen),
+            *[(name, _fingerprint(used[name], seen)) for name in sorted(used)],
+        )
+    if inspect.ismodule(value):
+        return content_hash("module", value.__name__)
+    if inspect.isclass(value) or inspect.isbuiltin(value):
+        return content_hash("named", value.__module__, value.__qualname__)
+    if isinstance(value, np.ndarray):
+        return content_hash(value)
+    if isinstance(value, Table):
+        return content_hash(
+            "table",
+            *[(label, content_hash(value.column(label))) for label in value.labels],
+        )
+    try:
+        return content_hash(pickle.dumps(value))
+    except Exception:
+        return content_hash(repr(value))
+
+
+def _code_fingerprint(code):
+    """A hash of the bytecode, names, and constants of a code object."""
+    constants = [
+        _code_fingerprint(c) if inspect.iscode(c) else repr(c) for c in code.co_consts
+    ]
+    return content_hash(code.co_code, code.co_names, *constants)
+
+
+class _FrameCache:
+    """
+    Saves the frames html_interact renders for f, so running the same cell
+    again, even after restarting the kernel, reuses every frame whose
+    inputs have not changed.  A frame is named by a hash of f (see
+    _fingerprint), the Fixed values, and the CSV key for the other values.
+    Images are kept in the images directory, named {prefix}-image-cached-*
+    so they can be told apart from the images other cells save, and html
+    in the user's cache directory.  Both are limited in size, with the
+    least recently used frames, including those from old versions of a
+    function, deleted first.  Only frames the cache saved are ever deleted.
+    """
+
+    def __init__(self, f, fixed):
+        self._base = content_hash(
+            _fingerprint(f), *[(param, _fingerprint(v)) for param, v in fixed]
+        )
+        self._prefix = os.getenv("LECTURE_NAME", "ex")
+        self._images = FileCache(
+            "images", _IMAGE_CACHE_BYTES, pattern=f"{self._prefix}-image-cached-*.png"
+        )
+        self._htmls = FileCache(cache_directory("interact"), _HTML_CACHE_BYTES)
+
+    def _fid(self, key):
+        return "cached-" + content_hash(self._base, key)[:32]
+
+    def get(self, key):
+        """Return the saved (html or image file name, image height), or None."""
+        fid = self._fid(key)
+        png = self._images.get(f"{self._prefix}-image-{fid}.png")
+        if png is not None:
+            # The image height is in the PNG header.
+            return f"images/{self._prefix}-image-{fid}.png", int.from_bytes(
+                png[20:24], "big"
+            )
+        html = self._htmls.get(fid + ".html")
+        if html is not None:
+            return html.decode(), None
+        return None
+
+    def put(self, key, kind, content, height):
+        """Save a newly rendered frame, and return it as get would."""
+        fid = self._fid(key)
+        if kind == "image":
+            return _save_image(content, fid), height
+        self._htmls.put(fid + ".html", content.encode(), shrink=False)
+        return content, None
+
+    def shrink(self):
+        self._images.shrink()
+        self._htmls.shrink()
+
 
-    def precompute(f, fixed, params):
+# The function a worker process calls to render one combination.
+_render_job = None
+
+
+def _start_render_worker(job):
+    global _render_job
+    _render_job = job
+    plt.switch_backend("Agg")
+    plt.close("all")
+
+
+def _run_render_job(task):
+    # Forked workers all start with the same global random state, and
+    # which worker gets which combination depends on scheduling, so seed
+    # np.random from the combination's index.  Then functions that draw
+    # random numbers get independent draws, and the same ones every time.
+    entropy, index, item = task
+    seed_global_random(np.random.SeedSequence(entropy, spawn_key=(index,)))
+    return _render_job(item)
+
+
+def _map_renders(job, items, workers):
+    """
+    Return [job(item) for index, item in items], in that order, where each
+    index is the position of the item's combination among all of them.
+    The work is split across workers processes if there is more than one
+    and job can be sent to them (see worker_context), and otherwise done
+    in this process.
+    """
+    workers = min(int(workers or 1), len(items))
+    context = worker_context(job) if workers > 1 else None
+    if context is None:
+        return [job(item) for _, item in items]
+
+    # Drawn from np.random so notebooks that call np.random.seed get the
+    # same results every time they run.
+    entropy = np.random.randint(2**31)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_start_render_worker,
+        initargs=(job,),
+    ) as executor:
+        tasks = [(entropy, index, item) for index, item in items]
+        return list(executor.map(_run_render_job, tasks))
+
+
+def _permutations(f, kwargs, workers=None, cache=False, save_images=True):
+    def csv_key(params):
         keys = [(x, v) for (x, (_, v)) in params]
+        return create_csv_line((list(zip(*keys))[1]))
+
+    def precompute(params):
         values = [(x, v) for (x, (v, _)) in params]
         result = f(**(dict(values) | dict(fixed)))
-        key = create_csv_line((list(zip(*keys))[1]))
-        html, iheight = htmlify(result)
-        return (key, html), iheight
+        return _render(result)
 
     lists = [
         [(param, (v, control._format(v))) for v in control._values()]
@@ -387,30 +588,37 @@ def _permutations(f, kwargs):
         if isinstance(control, Fixed)
     ]
 
-    # Turn off plotting and make tables bigger while computing the function.
-    # Add any other special cases about displaying output here.
-
-    with plt.ioff():
-        res = list(itertools.product(*lists))
-        max_str_rows = Table.max_str_rows
-        iheight = None
-        try:
-            Table.max_str_rows = 30
-
-            (key, html), iheight = precompute(f, fixed, res[0])
-            precomputed = [(key,html)]
-
-            num_cores = 1
+    res = list(itertools.product(*lists))
+    keys = [csv_key(params) for params in res]
+
+    frames = [None] * len(res)
+    if cache:
+        frame_cache = _FrameCache(f, fixed)
+        frames = [frame_cache.get(key) for key in keys]
+    missing = [i for i, frame in enumerate(frames) if frame is None]
+
+    with _rendering():
+        # The first combination is rendered here, which also catches
+        # any errors in f before starting the workers.
+        rendered = [precompute(res[i]) for i in missing[:1]]
+        rendered += _map_renders(
+            precompute, [(i, res[i]) for i in missing[1:]], workers
+        )
 
-            with ThreadPoolExecutor(max_workers=num_cores) as executor:
-                futures = [executor.submit(precompute, f, fixed, params) for params in res[1:]]
-                for future in as_completed(futures):
-                    (key, html), height = future.result()
-                    precomputed.append((key, html))
-            return dict(precomputed), iheight
-        finally:
-            Table.max_str_rows = max_str_rows
+    for i, (kind, content, height) in zip(missing, rendered):
+        if cache:
+            frames[i] = frame_cache.put(keys[i], kind, content, height)
+        elif kind == "image" and save_images:
+            frames[i] = _save_image(content), height
+        else:
+            frames[i] = content, height
+    if cache:
+        frame_cache.shrink()
 
+    # Keys are in the order of the combinations, however the work was split.
+    precomputed = {key: content for key, (content, _) in zip(keys, frames)}
+    iheight = frames[0][1]
+    return precomputed, iheight
 
 
 def check_parameters(f, kwargs):
@@ -439,10 +647,364 @@ def make_widgets(f, kwargs):
     return widgets
 
 
-def html_interact(f, max_choices=128, **kwargs):
-    uid = uuid()
+# The most pixels in one sprite sheet.  Browsers on phones and tablets may
+# refuse to decode larger images, and a sheet this size takes 64MB to build.
+_SPRITE_MAX_PIXELS = 2**24
+
+
+def _pack_images(data, images):
+    """
+    Return data, which maps each key to an image file name or the image's
+    png bytes, packed as images says, along with a list of the file names
+    of any sprite sheets:
+
+    - "files": each frame in its own file (the data is unchanged).
+    - "inline": each frame as a data: url, so the page needs no files.
+    - "sprite": every distinct frame in a sprite sheet, laid out in a grid
+      of cells the size of the largest frame.  Frames are split across as
+      few sheets of at most _SPRITE_MAX_PIXELS pixels as they fit in.  Each
+      key maps to "sheet,x,y,width,height" for its frame.
+    """
+
+    def png_bytes(frame):
+        if isinstance(frame, bytes):
+            return frame
+        with open(frame, "rb") as f:
+            return f.read()
+
+    if images == "files":
+        return data, []
+
+    if images == "inline":
+        return {
+            key: "data:image/png;base64,"
+            + base64.b64encode(png_bytes(frame)).decode()
+            for key, frame in data.items()
+        }, []
+
+    pngs = {key: png_bytes(frame) for key, frame in data.items()}
+    distinct = list(dict.fromkeys(pngs.values()))
+
+    # Only the sizes are read here: the pixels are decoded one frame at a
+    # time as they are pasted into a sheet.
+    sizes = [PIL.Image.open(io.BytesIO(png)).size for png in distinct]
+    width = max(w for w, _ in sizes)
+    height = max(h for _, h in sizes)
+
+    # Sheets are at most about sqrt(_SPRITE_MAX_PIXELS) pixels wide, which
+    # keeps them within browsers' width and height limits too.
+    columns = max(1, math.isqrt(_SPRITE_MAX_PIXELS) // width)
+    rows = max(1, _SPRITE_MAX_PIXELS // (columns * width * height))
+    per_sheet = columns * rows
+
+    positions = {}
+    sheets = []
+    for first in range(0, len(distinct), per_sheet):
+        chunk = distinct[first : first + per_sheet]
+        used_columns = min(columns, len(chunk))
+        used_rows = math.ceil(len(chunk) / used_columns)
+        sheet = PIL.Image.new("RGBA", (used_columns * width, used_rows * height))
+        for i, png in enumerate(chunk):
+            x, y = (i % used_columns) * width, (i // used_columns) * height
+            with PIL.Image.open(io.BytesIO(png)) as frame:
+                sheet.paste(frame.convert("RGBA"), (x, y))
+                w, h = frame.size
+            positions[png] = f"{len(sheets)},{x},{y},{w},{h}"
+
+        # Named by its contents, so running the cell again reuses the file.
+        packed = io.BytesIO()
+        sheet.save(packed, format="png")
+        fid = "sprite-" + content_hash(*chunk)[:32]
+        sheets.append(_save_image(packed.getvalue(), fid))
+
+    return {key: positions[png] for key, png in pngs.items()}, sheets
+
+
+def _payload_script(uid, data, compress):
+    """
+    Return JavaScript that passes the precomputed data to load_{uid}.
+    Functions often give the same result for many combinations, so each
+    distinct fragment of html (or image file name) is sent once, along
+    with the index of the fragment for each key.  If compress is True, the
+    payload is gzipped and base64 encoded, and the browser decompresses it
+    with DecompressionStream, or shows a message in place of the output if
+    it cannot.  Otherwise it is plain JSON.
+    """
+    fragments = list(dict.fromkeys(data.values()))
+    index = {fragment: i for i, fragment in enumerate(fragments)}
+    payload = json.dumps(
+        {
+            "keys": list(data.keys()),
+            "frames": [index[fragment] for fragment in data.values()],
+            "fragments": fragments,
+        },
+        separators=(",", ":"),
+    )
+    if compress:
+        encoded = base64.b64encode(gzip.compress(payload.encode(), mtime=0))
+        return (
+            f'decompressPayload("{encoded.decode()}").then(load_{uid})'
+            f'.catch(() => showPayloadError("output_{uid}"));'
+        )
+    # Keep any "</script>" in the fragments from ending the script early.
+    payload = payload.replace("</", "<\\/")
+    return f"load_{uid}({payload});"
+
+
+# How many rendered combinations a lazy html_interact keeps.
+_LAZY_CACHE_SIZE = 64
+
+# How many processes a lazy html_interact renders neighbors in by default.
+_LAZY_WORKERS = 2
+
+# The _LazyRenderer whose worker pool is running.  Only one runs at a time,
+# so however many lazy cells a notebook has, at most one pool is running.
+_active_renderer = None
+
+
+class _LazyRenderer:
+    """
+    Renders combinations of control values for a lazy html_interact as
+    they are needed.  The most recent results are kept, and after each
+    request the neighboring values of each control (one step either way)
+    are rendered in worker processes, so moving a slider usually finds its
+    next frame ready.  The workers start when they are first needed, and
+    stop when another lazy renderer starts its own, when the widget is
+    closed, or when any cell runs, since that may change the variables f
+    uses.
+    """
+
+    def __init__(self, f, kwargs, workers):
+        self._f = f
+        self._controls = {
+            param: control
+            for param, control in kwargs.items()
+            if not isinstance(control, Fixed)
+        }
+        self._fixed = {
+            param: control._value
+            for param, control in kwargs.items()
+            if isinstance(control, Fixed)
+        }
+        if workers is None:
+            workers = min(_LAZY_WORKERS, os.cpu_count() or 1)
+        self._workers = max(1, int(workers))
+        self._executor = None
+        self._results = OrderedDict()  # key -> result or Future
+
+    def close(self):
+        """Stop the workers, and forget results that may be out of date."""
+        global _active_renderer
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._results.clear()
+        if _active_renderer is self:
+            _active_renderer = None
+
+    def _render_values(self, values):
+        with _rendering():
+            return _render(self._f(**(values | self._fixed)))
+
+    def _controlled(self, values):
+        # The Fixed values stay in this process: they need not be picklable.
+        return {param: values[param] for param in self._controls}
+
+    def _key(self, values):
+        return tuple(
+            control._format(values[param])
+            for param, control in self._controls.items()
+        )
+
+    def _remember(self, key, result):
+        self._results[key] = result
+        self._results.move_to_end(key)
+        while len(self._results) > _LAZY_CACHE_SIZE:
+            _, dropped = self._results.popitem(last=False)
+            if isinstance(dropped, Future):
+                dropped.cancel()
+
+    def get(self, values):
+        """Return the rendered (kind, content, height) for the values."""
+        values = self._controlled(values)
+        key = self._key(values)
+        result = self._results.get(key)
+        if isinstance(result, Future):
+            try:
+                result = result.result()
+            except Exception:
+                result = None  # render it here, where any error is reported
+        if result is None:
+            result = self._render_values(values)
+        self._remember(key, result)
+        return result
+
+    def _choice_index(self, control, value):
+        """The position of value among control's values, or None."""
+        choices = list(control._values())
+        if isinstance(control, Slider):
+            return int(np.argmin(np.abs(np.array(choices) - value)))
+        elif value in choices:
+            return choices.index(value)
+        return None
+
+    def _combination_index(self, values):
+        """The position of values among all the combinations."""
+        indices = [
+            self._choice_index(control, values[param])
+            for param, control in self._controls.items()
+        ]
+        sizes = [len(control._values()) for control in self._controls.values()]
+        return int(np.ravel_multi_index(indices, sizes)) if sizes else 0
+
+    def _neighbors(self, values):
+        for param, control in self._controls.items():
+            choices = list(control._values())
+            index = self._choice_index(control, values[param])
+            if index is None:
+                continue
+            for i in (index + 1, index - 1):
+                if 0 <= i < len(choices):
+                    yield values | {param: choices[i]}
+
+    def prefetch(self, values):
+        """Start rendering the neighbors of values that are not ready."""
+        global _active_renderer
+        context = worker_context(self._render_values)
+        if context is None:
+            return
+        values = self._controlled(values)
+        if self._executor is None:
+            _close_active_renderer()
+            self._entropy = np.random.randint(2**31)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers,
+                mp_context=context,
+                initializer=_start_render_worker,
+                initargs=(self._render_values,),
+            )
+            _active_renderer = self
+        for neighbor in self._neighbors(values):
+            key = self._key(neighbor)
+            if key not in self._results:
+                task = (self._entropy, self._combination_index(neighbor), neighbor)
+                future = self._executor.submit(_run_render_job, task)
+                self._remember(key, future)
+
+
+def _close_active_renderer(*args):
+    """Stop the running lazy renderer's workers, if there are any."""
+    if _active_renderer is not None:
+        _active_renderer.close()
+
+
+# Running a cell may change the variables a lazy renderer's function uses,
+# which workers forked earlier would not see, and re-running a lazy cell
+# leaves the old widget (and its renderer) in ipywidgets' registry.
+try:
+    ipy = get_ipython()
+    if ipy != None:
+        ipy.events.register("pre_run_cell", _close_active_renderer)
+except NameError:
+    pass
+
+
+def _lazy_interact(f, kwargs, workers):
+    widgets = make_widgets(f, kwargs)
+    renderer = _LazyRenderer(f, kwargs, workers)
+
+    def show(**values):
+        kind, content, height = renderer.get(values)
+        if kind == "image":
+            display(Image(data=content))
+        else:
+            display(HTML(content))
+        renderer.prefetch(values)
+
+    def closed(change):
+        if change["new"] is None:
+            renderer.close()
+
+    widget = ipywidgets.interactive(show, **widgets)
+    widget.observe(closed, names="comm")
+    display(widget)
+
+
+def html_interact(
+    f,
+    max_choices=128,
+    workers=None,
+    cache=False,
+    lazy=False,
+    compress=False,
+    images="files",
+    **kwargs,
+):
+    """
+    Create an interactive visualization that works without a running
+    kernel, by computing f for every combination of the control values
+    ahead of time and embedding the results in the page.
+
+    Parameters:
+    - f: the function to visualize.
+    - max_choices: the most combinations to compute.  Controls with many
+         values are downsampled until the combinations fit.
+    - workers: the number of processes to compute the combinations in.
+         The default is to compute them all in this process.  Where
+         processes cannot be forked (eg: on macOS and Windows), they are
+         always computed in this process.
+    - cache: if True, save the results for each combination, and reuse
+         them when this cell runs again, as long as f, the variables it
+         uses, and the Fixed values have not changed.  Don't use this if
+         f draws random numbers and should show new ones each time.
+    - lazy: if True, compute only the first combination ahead of time,
+         and the others as the controls change.  This needs a running
+         kernel, but does not limit the number of choices.  Recent results
+         are kept, and the neighboring values of each control are computed
+         in the background while you look at the current one, in two
+         processes unless workers says otherwise.  It cannot be combined
+         with max_choices, cache, compress, or images, which only apply to
+         results computed ahead of time.
+    - compress: if True, gzip the precomputed results in the page, which
+         keeps notebooks small.  Browsers older than 2023 cannot read them,
+         and show a message in place of the output instead.
+    - images: how to store plots.  "files" saves each one as a png file in
+         the images directory.  "sprite" packs them into one image (or a
+         few, for large plots), so the page loads them all with a few
+         requests, and "inline" puts them in the page itself, so it needs
+         no image files at all.
+    - kwargs: a list of parameters with the same names as f's parameters,
+              each of which is set to a Control object.
+    """
     check_parameters(f, kwargs)
 
+    if lazy:
+        ignored = [
+            name
+            for name, value, default in [
+                ("max_choices", max_choices, 128),
+                ("cache", cache, False),
+                ("compress", compress, False),
+                ("images", images, "files"),
+            ]
+            if value != default
+        ]
+        if ignored != []:
+            raise ValueError(
+                f"{', '.join(ignored)} cannot be used with lazy=True, which "
+                "computes results as they are needed instead of saving them "
+                "in the page."
+            )
+        _lazy_interact(f, kwargs, workers)
+        return
+
+    uid = uuid()
+
+    if images not in ("files", "sprite", "inline"):
+        raise ValueError(
+            f'images must be "files", "sprite", or "inline", not {repr(images)}'
+        )
+
     # not control gets more than 32 steps
     for (_, x) in kwargs.items():
         while len(x._values()) > 32:
@@ -471,9 +1033,52 @@ def html_interact(f, max_choices=128, **kwargs):
         ]
     )
 
-    data, iheight = _permutations(f, kwargs)
-
+    data, iheight = _permutations(
+        f, kwargs, workers, cache, save_images=images == "files"
+    )
+    sheets = []
     if iheight:
+        data, sheets = _pack_images(data, images)
+
+    if sheets:
+        full_html = textwrap.dedent(
+            f"""\
+                    <div>
+                        {"  ".join(htmls)}
+                        <div class="interact-output" style="display: flex; align-items: top;">
+                            <div id="output_{uid}" style="background-repeat: no-repeat;"></div>
+                        </div>
+                    </div>
+            """
+        )
+
+        updater = textwrap.dedent(
+            f"""\
+            var _sprite_{uid} = document.getElementById('output_{uid}');
+            var _sheets_{uid} = {json.dumps(sheets)};
+            var _cache_{uid} = {{}};
+
+            function update_{uid}() {{
+                var text = createCSVLine([{", ".join([ f"{control._uid}_value()" for _, control in kwargs.items() if not isinstance(control, Fixed)])}]);
+                if (!(text in _cache_{uid})) return;  // still loading
+                var [sheet, x, y, width, height] = _cache_{uid}[text].split(",");
+                _sprite_{uid}.style.backgroundImage = "url('" + _sheets_{uid}[sheet] + "')";
+                _sprite_{uid}.style.backgroundPosition = "-" + x + "px -" + y + "px";
+                _sprite_{uid}.style.width = width + "px";
+                _sprite_{uid}.style.height = height + "px";
+            }}
+
+            function load_{uid}(payload) {{
+                payload.keys.forEach((key, i) => {{
+                    _cache_{uid}[key] = payload.fragments[payload.frames[i]];
+                }});
+                update_{uid}();
+                preloadImages(_sheets_{uid});
+            }}
+            {_payload_script(uid, data, compress)}
+        """
+        )
+    elif iheight:
         full_html = textwrap.dedent(
             f"""\
                     <div>
@@ -488,19 +1093,29 @@ def html_interact(f, max_choices=128, **kwargs):
         updater = textwrap.dedent(
             f"""\
             var _img_{uid} = document.getElementById('output_{uid}');
-            var _cache_{uid} = {json.dumps(data, indent=2)};
+            var _cache_{uid} = {{}};
+            var _fragments_{uid} = [];
             var _preloaded_{uid} = false;
 
             function update_{uid}(preload = true) {{
                 var text = createCSVLine([{", ".join([ f"{control._uid}_value()" for _, control in kwargs.items() if not isinstance(control, Fixed)])}]);
+                if (!(text in _cache_{uid})) return;  // still loading
                 _img_{uid}.src = _cache_{uid}[text];
 
-                if (preload && false && !_preloaded_{uid}) {{
+                if (preload && !_preloaded_{uid}) {{
                     _preloaded_{uid} = true;
-                    preloadImages([{",".join([ f'"{x}"' for x in data.values() ])}]);
+                    preloadImages(_fragments_{uid});
                 }}
             }} 
-            update_{uid}(preload = false);
+
+            function load_{uid}(payload) {{
+                payload.keys.forEach((key, i) => {{
+                    _cache_{uid}[key] = payload.fragments[payload.frames[i]];
+                }});
+                _fragments_{uid} = payload.fragments;
+                update_{uid}();
+            }}
+            {_payload_script(uid, data, compress)}
         """
         )
     else:
@@ -517,14 +1132,22 @@ def html_interact(f, max_choices=128, **kwargs):
         updater = textwrap.dedent(
             f"""\
             var _output_{uid} = document.getElementById('output_{uid}');
-            var _cache_{uid} = {json.dumps(data, indent=2)};
+            var _cache_{uid} = {{}};
 
             function update_{uid}() {{
                 var text = createCSVLine([{", ".join([ f"{control._uid}_value()" for _, control in kwargs.items() if not isinstance(control, Fixed)])}]);
                 console.log(text)
+                if (!(text in _cache_{uid})) return;  // still loading
                 _output_{uid}.innerHTML = _cache_{uid}[text];
             }} 
-            update_{uid}();
+
+            function load_{uid}(payload) {{
+                payload.keys.forEach((key, i) => {{
+                    _cache_{uid}[key] = payload.fragments[payload.frames[i]];
+                }});
+                update_{uid}();
+            }}
+            {_payload_script(uid, data, compress)}
         """
         )
 
@@ -601,6 +1224,20 @@ def html_interact(f, max_choices=128, **kwargs):
                 .catch(error => console.error("Error loading some images:", error));
         }}
         
+        async function decompressPayload(encoded) {{
+            const bytes = Uint8Array.from(atob(encoded), c => c.charCodeAt(0));
+            const stream = new Blob([bytes]).stream()
+                .pipeThrough(new DecompressionStream("gzip"));
+            return JSON.parse(await new Response(stream).text());
+        }}
+
+        function showPayloadError(id) {{
+            const message = document.createElement("div");
+            message.textContent = "This browser cannot show this output.  " +
+                "Run html_interact again with compress=False.";
+            document.getElementById(id).replaceWith(message);
+        }}
+
         function createCSVLine(values) {{
             return values.map(value => {{
                 let stringValue = ""
@@ -0,0 +1,35 @@
+__all__ = []
+
+import multiprocessing
+import pickle
+
+import numpy as np
+
+
+def worker_context(job):
+    """
+    The multiprocessing context for a pool of worker processes running
+    job, or None if job cannot be sent to them.  Forked workers inherit
+    the job, so it need not be picklable.  This matters because functions
+    defined in notebooks, and lambdas, are not.  Fork is only used where
+    it is the default, though: macOS defaults to spawn because forking a
+    multi-threaded process there is unsafe.
+    """
+    context = multiprocessing.get_context()
+    if context.get_start_method() == "fork":
+        return context
+    try:
+        pickle.dumps(job)
+        return context
+    except Exception:
+        return None
+
+
+def seed_global_random(seed_sequence):
+    """
+    Reset the global np.random state from seed_sequence.  Workers all
+    start with the same global state, and the functions students pass to
+    the library draw from it, so each task seeds it from its own sequence.
+    """
+    bit_generator = np.random.MT19937(seed_sequence)
+    np.random.set_state(np.random.RandomState(bit_generator).get_state())
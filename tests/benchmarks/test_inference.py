@@ -0,0 +1,166 @@
+"""
+Benchmarks for the hot paths in cs104.inference, run with pytest-benchmark.
+
+    make benchmark_baseline   # record timings for this machine
+    make benchmark            # compare against the last recorded timings
+
+The comparison fails if any benchmark's mean time is more than 25% slower
+than the baseline.  Baselines are saved under tests/benchmarks/.baselines
+and are only meaningful on the machine that recorded them.
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+from datascience import Table
+
+from cs104.inference import (
+    bootstrap_statistic,
+    confidence_interval,
+    linear_regression,
+    plot_regression_line_and_mse_heat,
+    simulate,
+    simulate_permutation_statistic,
+)
+
+_data_dir = os.path.join(os.path.dirname(__file__), "..")
+
+# Slow benchmarks run a fixed, small number of rounds so the whole suite
+# finishes in a few minutes.
+_ROUNDS = 3
+
+
+def _pedantic(benchmark, f, *args, **kwargs):
+    return benchmark.pedantic(
+        f, args=args, kwargs=kwargs, rounds=_ROUNDS, iterations=1, warmup_rounds=0
+    )
+
+
+@pytest.fixture(scope="module")
+def countries():
+    """
+    Fertility, child mortality, and population by country and year, with
+    a column dividing the rows into the years before and after 1950.
+    """
+    fertility = Table.read_table(os.path.join(_data_dir, "fertility.csv"))
+    mortality = Table.read_table(os.path.join(_data_dir, "child_mortality.csv"))
+    population = Table.read_table(os.path.join(_data_dir, "population.csv"))
+    joined = fertility.join(["geo", "time"], mortality).join(
+        ["geo", "time"], population
+    )
+    joined = joined.relabeled(
+        [
+            "children_per_woman_total_fertility",
+            "child_mortality_0_5_year_olds_dying_per_1000_born",
+            "population_total",
+        ],
+        ["Fertility", "Child Mortality", "Population"],
+    )
+    return joined.with_column("Modern", joined.column("time") >= 1950)
+
+
+def _random_rows(table, num_rows):
+    np.random.seed(0)
+    return table.take(np.random.choice(table.num_rows, num_rows, replace=False))
+
+
+@pytest.mark.parametrize("num_trials", [1000, 10000])
+def test_simulate(benchmark, countries, num_trials):
+    population = countries.column("Population")
+
+    def mean_of_sample():
+        return np.mean(np.random.choice(population, 100))
+
+    result = _pedantic(benchmark, simulate, mean_of_sample, num_trials)
+    assert len(result) == num_trials
+
+
+@pytest.mark.parametrize("sample_size", [100, 1000])
+@pytest.mark.parametrize("num_trials", [1000, 10000, 100000])
+def test_bootstrap_statistic_batched(benchmark, countries, num_trials, sample_size):
+    sample = _random_rows(countries, sample_size).column("Fertility")
+    result = _pedantic(benchmark, bootstrap_statistic, sample, np.mean, num_trials)
+    assert len(result) == num_trials
+
+
+@pytest.mark.parametrize("num_trials", [1000, 10000])
+def test_bootstrap_statistic_per_sample(benchmark, countries, num_trials):
+    sample = _random_rows(countries, 100).column("Fertility")
+
+    def median(s):
+        return np.median(s)
+
+    result = _pedantic(benchmark, bootstrap_statistic, sample, median, num_trials)
+    assert len(result) == num_trials
+
+
+@pytest.mark.parametrize("num_rows", [100, 1000, 10000])
+@pytest.mark.parametrize("num_trials", [1000, 10000])
+def test_simulate_permutation_statistic(benchmark, countries, num_trials, num_rows):
+    table = _random_rows(countries, num_rows).select("Modern", "Fertility")
+    result = _pedantic(
+        benchmark,
+        simulate_permutation_statistic,
+        table,
+        "Modern",
+        "Fertility",
+        num_trials,
+    )
+    assert len(result) == num_trials
+
+
+@pytest.mark.parametrize("num_rows", [100, 10000, None])
+def test_linear_regression(benchmark, countries, num_rows):
+    table = countries if num_rows is None else _random_rows(countries, num_rows)
+    result = benchmark(linear_regression, table, "Fertility", "Child Mortality")
+    assert len(result) == 2
+
+
+def test_linear_regression_minimize(benchmark, countries):
+    table = _random_rows(countries, 1000)
+    result = _pedantic(
+        benchmark,
+        linear_regression,
+        table,
+        "Fertility",
+        "Child Mortality",
+        method="minimize",
+    )
+    assert len(result) == 2
+
+
+@pytest.mark.parametrize("num_statistics", [10000, 100000, 1000000])
+def test_confidence_interval(benchmark, num_statistics):
+    statistics = np.random.default_rng(0).normal(size=num_statistics)
+    result = benchmark(confidence_interval, 95, statistics)
+    assert len(result) == 2
+
+
+@pytest.mark.parametrize("grid_size", [50, 200, 500])
+def test_plot_regression_line_and_mse_heat(benchmark, countries, grid_size):
+    table = _random_rows(countries, 1000)
+    a, b = linear_regression(table, "Fertility", "Child Mortality")
+
+    def plot():
+        plot_regression_line_and_mse_heat(
+            table,
+            "Fertility",
+            "Child Mortality",
+            a,
+            b,
+            show_mse="2d",
+            a_space=np.linspace(-10 * a, 10 * a, grid_size),
+            b_space=np.linspace(-10 * b, 10 * b, grid_size),
+        )
+        plt.close("all")
+
+    _pedantic(benchmark, plot)